@@ -0,0 +1,283 @@
+"""
+End-to-end throughput, latency and memory of the streaming pipeline at increasing source rates
+
+Every rate runs in its own process (fresh JVM): the replay server paces synthetic transactions at the target
+rate, stamping each publish batch's send time (microseconds) into the 'id' column, and the pipeline publishes
+to in-memory sinks. The map sink reads the stamps back, so latency is measured from the source send to the
+sink write, after a warm-up. The driver and all its child processes (the JVM) are sampled for peak RSS.
+
+Rates double until the pipeline saturates (sustained < 'min-ratio' x target, or p99 latency above
+'max-p99'), then the gap between the last sustainable rate and the first saturated one is bisected.
+
+usage (from the repository root):
+    python -m benchmarks.end_to_end [--mode dstream] [--master local[4]] [--start 1000] [--max-rate 512000]
+                                    [--duration 60] [--warmup 20] [--report end_to_end.json]
+
+The source shares the driver's Python process, like in 'benchmarks.streaming'; at very high rates it competes
+with the driver for the GIL, which the 'source_rate' of each run shows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from itertools import cycle, islice
+
+import numpy as np
+
+from benchmarks.parsing import generate_lines
+from benchmarks.streaming import CountingSink
+from pipeline.schema import column_index
+from plot.sinks import MemorySink
+from replay import ReplayServer, RateScheduler, BLOCK  # on sys.path through benchmarks.streaming
+
+percentiles = (50, 90, 99, 99.9)
+
+
+class LatencySink(CountingSink):
+    """Counts the transactions reaching the map and, while recording, their end-to-end latency"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.recording = False
+        self.latencies = []
+
+    def _write(self, update):
+        now = time.time()
+        super()._write(update)
+        if self.recording:
+            # map text is '<id>/<entity_id>...' and the id is the send time in microseconds
+            sent = np.array([int(text[:text.index('/')]) for text in update['text']], dtype=np.int64)
+            with self.lock:
+                self.latencies.append(now - sent / 1e6)
+
+    def record(self, recording):
+        with self.lock:
+            self.recording = recording
+
+    def latency(self):
+        with self.lock:
+            latencies = np.concatenate(self.latencies) if self.latencies else np.empty(0)
+        if not len(latencies):
+            return None
+        summary = {"p{:g}".format(p): round(float(v), 4) for p, v in zip(percentiles,
+                                                                         np.percentile(latencies, percentiles))}
+        summary.update(mean=round(float(latencies.mean()), 4), max=round(float(latencies.max()), 4),
+                       samples=len(latencies))
+        return summary
+
+
+class MemorySampler:
+    """Peak resident memory of this process and all of its descendants, sampled from /proc"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def rss(root=None):
+        root = root or os.getpid()
+        parents, rss = {}, {}
+        for pid in filter(str.isdigit, os.listdir('/proc')):
+            try:
+                with open('/proc/{}/stat'.format(pid)) as f:
+                    stat = f.read().rsplit(')', 1)[1].split()
+                parents[int(pid)] = int(stat[1])
+                rss[int(pid)] = int(stat[21]) * resource.getpagesize()
+            except (OSError, IndexError, ValueError):
+                pass
+        tree, total = {root}, 0
+        for pid in sorted(parents):
+            # children have higher pids than their parents, except after pid wrap-around
+            if pid in tree or parents[pid] in tree:
+                tree.add(pid)
+                total += rss.get(pid, 0)
+        return total
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def start(self):
+        if os.path.isdir('/proc'):
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        else:
+            # no /proc: the driver's own peak only (kilobytes on Linux, bytes on macOS)
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = maxrss if sys.platform == 'darwin' else maxrss * 1024
+        return self.peak
+
+
+def stamped(lines):
+    """Every line split around its 'id' field, as encoded (head, tail), ready to be stamped per batch"""
+    i = column_index['id']
+    parts = []
+    for line in lines:
+        fields = line.split(',')
+        parts.append((','.join(fields[:i] + ['']).encode('utf-8'),
+                      (',' + ','.join(fields[i + 1:]) + '\n').encode('utf-8')))
+    return parts
+
+
+def start_source(port, subscribers, lines, rate):
+    """Replay 'lines' in a loop at 'rate' events/sec from a background thread, the batch send time as id"""
+    parts = cycle(stamped(lines))
+    scheduler = RateScheduler(rate)
+
+    async def replay():
+        server = await ReplayServer('localhost', port, buffer_size=max(100000, int(rate) * 5), policy=BLOCK).start()
+        await server.wait_for_subscribers(subscribers)
+        while True:
+            n = await scheduler.acquire()
+            stamp = str(int(time.time() * 1e6)).encode('utf-8')
+            await server.publish([head + stamp + tail for head, tail in islice(parts, n)])
+            scheduler.record(n)
+
+    threading.Thread(target=asyncio.run, args=(replay(),), daemon=True).start()
+    return scheduler
+
+
+def run(mode, master, rate, batch_interval, duration, warmup, port):
+    """One rate, in this process: a JSON-able result"""
+    from pyspark.sql import SparkSession
+
+    sampler = MemorySampler().start()
+    spark = SparkSession.builder.master(master).appName("EndToEndBenchmark").getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+    sink = LatencySink()
+    sinks = {'map': sink, 'pie': MemorySink(maxlen=1), 'alerts': MemorySink(maxlen=1)}
+    lines = generate_lines(100000)
+
+    if mode == 'dstream':
+        from spark_streaming_transactions_app import create_stream
+        source = start_source(port, 1, lines, rate)
+        ssc = create_stream(spark, batch_interval, sinks, endpoints=[('localhost', port)])
+        ssc.start()
+    else:
+        from spark_structured_streaming_transactions_app import create_queries
+        source = start_source(port, 2, lines, rate)
+        queries = create_queries(spark, batch_interval, sinks, endpoints=[('localhost', port)])
+
+    time.sleep(warmup)
+    sink.record(True)
+    start, points, sent = time.time(), sink.points, source.sent
+    time.sleep(duration)
+    sink.record(False)
+    elapsed = time.time() - start
+    delivered, sent = sink.points - points, source.sent - sent
+
+    if mode == 'dstream':
+        ssc.stop(stopSparkContext=False, stopGraceFully=False)
+    else:
+        for query in queries:
+            query.stop()
+    spark.stop()
+
+    return {"rate": rate, "sustained": round(delivered / elapsed, 1), "source_rate": round(sent / elapsed, 1),
+            "latency": sink.latency(), "peak_rss_mb": round(sampler.stop() / 2 ** 20, 1)}
+
+
+def saturated(result, min_ratio, max_p99):
+    """Why a run could not keep up with its target rate, None if it did"""
+    if result["sustained"] < min_ratio * result["rate"]:
+        return "sustained {:.0f}/s < {:g} x {:g}/s".format(result["sustained"], min_ratio, result["rate"])
+    if result["latency"] is None:
+        return "no transaction reached the sink"
+    if result["latency"]["p99"] > max_p99:
+        return "p99 latency {:.2f}s > {:g}s".format(result["latency"]["p99"], max_p99)
+    return None
+
+
+def run_rate(args, rate):
+    """Runs one rate in a fresh interpreter and JVM, which prints its result as a 'result:' JSON line"""
+    cmd = [sys.executable, '-m', 'benchmarks.end_to_end', '--single', str(rate), '--mode', args.mode,
+           '--master', args.master, '--batch-interval', str(args.batch_interval), '--duration', str(args.duration),
+           '--warmup', str(args.warmup), '--port', str(args.port)]
+    output = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    result = json.loads([line for line in output.splitlines() if line.startswith('result: ')][-1][len('result: '):])
+    result["saturated"] = saturated(result, args.min_ratio, args.max_p99)
+    print("{:>10,.0f}/s target {:>10,.0f}/s sustained  p50 {:>7}  p99 {:>7}  peak {:>8,.0f}MB  {}".format(
+        rate, result["sustained"], (result["latency"] or {}).get("p50", '-'),
+        (result["latency"] or {}).get("p99", '-'), result["peak_rss_mb"], result["saturated"] or 'ok'))
+    return result
+
+
+def search(args):
+    """Doubling ramp up to the first saturated rate, then bisection of the last gap"""
+    runs, good, bad = [], None, None
+    rate = args.start
+    while rate <= args.max_rate:
+        runs.append(run_rate(args, rate))
+        if runs[-1]["saturated"]:
+            bad = rate
+            break
+        good = rate
+        rate *= 2
+    for _ in range(args.refine if good and bad else 0):
+        rate = (good + bad) / 2
+        runs.append(run_rate(args, rate))
+        if runs[-1]["saturated"]:
+            bad = rate
+        else:
+            good = rate
+    return runs, good, bad
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="End-to-end throughput and latency, up to saturation")
+    parser.add_argument('--mode', choices=['dstream', 'structured'], default='dstream')
+    parser.add_argument('--master', default='local[2]')
+    parser.add_argument('--batch-interval', type=int, default=5, help="seconds")
+    parser.add_argument('--start', type=float, default=1000, help="first target rate, events/sec")
+    parser.add_argument('--max-rate', type=float, default=512000)
+    parser.add_argument('--refine', type=int, default=2, help="bisection steps after the ramp")
+    parser.add_argument('--duration', type=int, default=60, help="measured seconds per rate")
+    parser.add_argument('--warmup', type=int, default=20, help="seconds ignored at the start of every rate")
+    parser.add_argument('--min-ratio', type=float, default=0.95, help="sustained / target below which it saturates")
+    parser.add_argument('--max-p99', type=float, help="p99 latency (s) above which it saturates, "
+                                                      "default 3 batch intervals")
+    parser.add_argument('--port', type=int, default=5990)
+    parser.add_argument('--report', default='end_to_end.json', help="JSON report path")
+    parser.add_argument('--single', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.max_p99 = args.max_p99 or 3 * args.batch_interval
+
+    if args.single:
+        result = run(args.mode, args.master, args.single, args.batch_interval, args.duration, args.warmup, args.port)
+        print('result: ' + json.dumps(result))
+        sys.exit()
+
+    runs, good, bad = search(args)
+    report = {
+        "mode": args.mode, "master": args.master, "batch_interval": args.batch_interval,
+        "duration": args.duration, "warmup": args.warmup, "min_ratio": args.min_ratio, "max_p99": args.max_p99,
+        "revision": git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+        "runs": runs,
+        # highest rate held, and the lowest one that was not (None if never reached)
+        "saturation": {"sustainable": good, "saturated": bad},
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print("Sustainable up to {} events/s, saturated at {}: report in {}".format(good, bad, args.report))
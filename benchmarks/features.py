@@ -0,0 +1,48 @@
+"""
+Feature store footprint and cost: every person of the dataset held at once, and the update time of a batch
+
+usage (from the repository root):
+    python -m benchmarks.features [entities]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.parsing import generate_lines
+from dataset.generator import number_of_people
+from pipeline.features import FeatureStore
+from pipeline.parser import parse_lines
+
+
+if __name__ == '__main__':
+    entities = int(sys.argv[1]) if len(sys.argv) > 1 else number_of_people
+
+    # every entity seen once, with its own id ('generate_lines' draws them at random)
+    batch = parse_lines(generate_lines(entities))
+    batch['entity_id'] = [str(i) for i in range(entities)]
+    store = FeatureStore()
+    start = time.perf_counter()
+    store.update(batch)
+    print("filled with {:,} entities in {:.2f}s".format(len(store), time.perf_counter() - start))
+    size = store.nbytes()
+    print("columns {:,} bytes, index {:,} bytes, {:.0f} bytes per entity".format(size['columns'], size['index'],
+                                                                                 size['per_entity']))
+
+    for rows in (1000, 10000, 100000):
+        batch = parse_lines(generate_lines(rows, seed=rows))
+        start = time.perf_counter()
+        for _ in range(5):
+            store.update(batch)
+        elapsed = (time.perf_counter() - start) / 5
+        print("batch of {:>7,} rows {:>9.1f} ms {:>12,.0f} rows/s".format(rows, elapsed * 1000, rows / elapsed))
+
+    with tempfile.TemporaryDirectory() as directory:
+        store.checkpoint = os.path.join(directory, 'features.npz')
+        start = time.perf_counter()
+        store.save()
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        FeatureStore(checkpoint=store.checkpoint)
+        print("checkpoint {:,} bytes, saved in {:.2f}s, loaded in {:.2f}s".format(
+            os.path.getsize(store.checkpoint), saved, time.perf_counter() - start))
@@ -0,0 +1,53 @@
+"""
+Replay socket payloads: CSV lines vs Arrow frames, in bytes and CPU per record on both ends
+
+The source side is what the replay server does per published batch (encode the lines, or build one frame),
+the consumer side what it takes to hand typed columns to Spark: parse the lines ('parse_row' as the old
+receiver did, or 'parse_lines'), or decode the frame into the Arrow batch the 'replay' data source gives Spark.
+CPU is process time, the batches are those of the replay server's 'publish'. Spark's own CSV parsing of the
+socket lines happens in the JVM and is not measured here.
+
+usage (from the repository root):
+    python -m benchmarks.framing [records]
+"""
+import sys
+import time
+
+from benchmarks.parsing import generate_lines, parse_row
+from pipeline.framing import decode_frame, encode_frame, length, spark_batch
+from pipeline.parser import parse_lines
+
+
+def cpu(f, batches):
+    start = time.process_time()
+    results = [f(batch) for batch in batches]
+    return time.process_time() - start, results
+
+
+def report(name, records, size, source, consumer):
+    print("{:<24} {:>10.1f} {:>14.2f} {:>16.2f} {:>13.2f}".format(name, size / records, source / records * 1e6,
+                                                                consumer / records * 1e6,
+                                                                (source + consumer) / records * 1e6))
+
+
+if __name__ == '__main__':
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = generate_lines(records)
+
+    print("{:<24} {:>10} {:>14} {:>16} {:>13}".format("payload", "bytes/rec", "source us/rec", "consumer us/rec",
+                                                      "total us/rec"))
+    for batch in (100, 1000, 10000):
+        batches = [lines[i:i + batch] for i in range(0, records, batch)]
+
+        source, encoded = cpu(lambda lines: ['{}\n'.format(line).encode('utf-8') for line in lines], batches)
+        size = sum(len(line) for lines in encoded for line in lines)
+        legacy, _ = cpu(lambda lines: [parse_row(line.decode('utf-8').rstrip('\n').split(',')) for line in lines],
+                        encoded)
+        columnar, _ = cpu(lambda lines: parse_lines([line.decode('utf-8').rstrip('\n') for line in lines]), encoded)
+        report("csv/{} parse_row".format(batch), records, size, source, legacy)
+        report("csv/{} parse_lines".format(batch), records, size, source, columnar)
+
+        source, frames = cpu(encode_frame, encoded)
+        size = sum(len(frame) for frame in frames)
+        consumer, _ = cpu(lambda frame: spark_batch(decode_frame(frame[length.size:])), frames)
+        report("arrow/{}".format(batch), records, size, source, consumer)
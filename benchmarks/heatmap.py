@@ -0,0 +1,40 @@
+"""
+Map payload per batch: one marker per transaction vs the changed cells of the grid heatmap
+
+Points are spread uniformly over central London (the worst case for the grid, real journeys follow a few
+streets), the heatmap being fed the batches one after the other.
+
+usage (from the repository root):
+    python -m benchmarks.heatmap [batches]
+"""
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.parsing import generate_lines
+from pipeline.grid import GridHeatmap, points_cells
+from pipeline.parser import parse_lines
+from pipeline.publishers import map_columns, map_update
+
+
+if __name__ == '__main__':
+    batches = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("{:>8} {:>14} {:>14} {:>8} {:>12}".format("rows", "points bytes", "cells bytes", "cells", "cells ms"))
+    for rows in (1000, 10000, 100000):
+        transactions = parse_lines(generate_lines(rows))
+        transactions['probability'] = np.random.default_rng(0).random(rows) * 0.02
+        points = len(json.dumps(map_update(transactions[map_columns], {})))
+
+        heatmap = GridHeatmap()
+        for _ in range(batches):
+            start = time.perf_counter()
+            heatmap.add(points_cells(transactions['gps_latitude'].values, transactions['gps_longitude'].values,
+                                     transactions['amount'].values, (transactions['probability'] > 0.01).values))
+            update = heatmap.changes()
+            elapsed = time.perf_counter() - start
+        cells = sum(len(columns['cells']) for columns in update.values())
+        print("{:>8,} {:>14,} {:>14,} {:>8,} {:>12.1f}".format(rows, points, len(json.dumps(update)), cells,
+                                                               elapsed * 1000))
@@ -0,0 +1,63 @@
+"""
+Throughput of the NumPy logistic regression engine, and its agreement with Spark
+
+usage (from the repository root):
+    python -m benchmarks.inference [rows] [--spark]
+
+'--spark' scores the same rows with 'LogisticRegressionModel.transform' and reports the largest probability
+difference and the number of differing predictions.
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.parsing import generate_lines
+from pipeline.inference import NumpyLogisticRegressionModel
+from pipeline.parser import parse_lines
+from pipeline.scoring import feature_columns, model_path
+
+
+def run_local(model, X, repeat=5):
+    for batch_size in (1000, 10000, 100000, len(X)):
+        batches = [X[i:i + batch_size] for i in range(0, len(X), batch_size)]
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for batch in batches:
+                model.predict_proba(batch)
+            best = min(best, time.perf_counter() - start)
+        print("batch {:>9,}: {:>14,.0f} rows/s".format(batch_size, len(X) / best))
+
+
+def compare_with_spark(model, transactions):
+    from pyspark.ml.classification import LogisticRegressionModel
+    from pyspark.ml.feature import VectorAssembler
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.master("local[2]").appName("InferenceBenchmark").getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+
+    df = spark.createDataFrame(transactions[feature_columns])
+    assembled = VectorAssembler(inputCols=feature_columns, outputCol="features").transform(df)
+    rows = LogisticRegressionModel.load(model_path).transform(assembled).select("probability", "prediction").collect()
+    spark_probability = np.array([row["probability"][1] for row in rows])
+    spark_prediction = np.array([row["prediction"] for row in rows])
+
+    probability, prediction = model.transform(transactions)
+    print("max |probability difference|: {:.3e}".format(np.abs(probability - spark_probability).max()))
+    print("differing predictions: {}".format(int((prediction != spark_prediction).sum())))
+    spark.stop()
+
+
+if __name__ == '__main__':
+    arguments = [a for a in sys.argv[1:] if not a.startswith('--')]
+    transactions = parse_lines(generate_lines(int(arguments[0]) if arguments else 1000000))
+
+    start = time.perf_counter()
+    model = NumpyLogisticRegressionModel.load()
+    print("model loaded in {:.3f}s".format(time.perf_counter() - start))
+
+    run_local(model, model.features(transactions))
+    if '--spark' in sys.argv:
+        compare_with_spark(model, transactions)
@@ -0,0 +1,87 @@
+"""
+Parsing throughput: legacy per-line 'parse_row' vs the columnar batch parser
+
+usage (from the repository root):
+    python -m benchmarks.parsing [rows] [--spark]
+
+'--spark' also times both paths inside a local[2] SparkSession ('parse_rdd' vs 'spark.read.csv' with the
+explicit schema).
+"""
+import random
+import sys
+import time
+
+from pyspark.sql import Row
+
+from pipeline.parser import parse_lines, parse_rdd_to_dataframe
+from pipeline.schema import columns, float_columns
+
+locations = ["Jermyn Street", "Oxford Street", "Regent Street", "Carnaby Street", "Westfield London", "Other"]
+types = ["PAYMENT", "TRANSFER", "CASH_OUT", "DEBIT", "CASH_IN"]
+
+
+def parse_row(row):
+    # verbatim copy of the original streaming app parser, kept as the baseline
+    new_row = []
+    for column in columns:
+        if column in float_columns:
+            new_row.append((column, float(row[columns.index(column)])))
+        else:
+            new_row.append((column, row[columns.index(column)]))
+    return Row(**dict(new_row))
+
+
+def generate_lines(n, seed=0):
+    rand = random.Random(seed)
+    lines = []
+    for i in range(n):
+        amount = round(rand.uniform(1, 100000), 2)
+        old_balance = round(rand.uniform(0, 200000), 2)
+        lines.append(','.join(str(v) for v in [
+            rand.randint(1, 743), rand.choice(types), amount, "C{}".format(rand.randrange(10 ** 9)),
+            old_balance, max(old_balance - amount, 0.0), "M{}".format(rand.randrange(10 ** 9)), 0.0, 0.0,
+            0, 0, rand.uniform(51.4, 51.6), rand.uniform(-0.23, -0.03), rand.choice(locations), i,
+            rand.randrange(636262)]))
+    return lines
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    f(*args)
+    return time.perf_counter() - start
+
+
+def report(name, rows, seconds):
+    print("{:<32} {:>12,.0f} rows/s  ({:.3f}s)".format(name, rows / seconds, seconds))
+
+
+def run_local(lines):
+    n = len(lines)
+    report("parse_row (per line)", n, timed(lambda: [parse_row(line.split(",")) for line in lines]))
+    report("parse_lines (columnar)", n, timed(parse_lines, lines))
+
+
+def run_spark(lines):
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.master("local[2]").appName("ParsingBenchmark").getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+    rdd = spark.sparkContext.parallelize(lines, 2).cache()
+    rdd.count()
+
+    n = len(lines)
+    # aggregate a typed column so neither path can skip the parsing
+    report("spark parse_rdd (per line)", n,
+           timed(lambda: rdd.map(lambda line: line.split(",")).map(parse_row).map(lambda row: row["amount"]).sum()))
+    report("spark read.csv (schema)", n,
+           timed(lambda: parse_rdd_to_dataframe(spark, rdd).groupBy().sum("amount").collect()))
+    spark.stop()
+
+
+if __name__ == '__main__':
+    arguments = [a for a in sys.argv[1:] if not a.startswith('--')]
+    lines = generate_lines(int(arguments[0]) if arguments else 200000)
+
+    run_local(lines)
+    if '--spark' in sys.argv:
+        run_spark(lines)
@@ -0,0 +1,45 @@
+"""
+Driver-side cost per batch of building the pie update
+
+    legacy:  collect (location, amount) tuples -> np.transpose(np.array(...)).tolist()
+    columns: label/value columns read from the windowed aggregates
+
+usage (from the repository root):
+    python -m benchmarks.pie [batches]
+"""
+import sys
+import timeit
+
+import numpy as np
+
+from benchmarks.parsing import locations
+from pipeline.windows import WindowedAggregates
+
+
+def legacy(rows):
+    array_data = np.transpose(np.array(rows)).tolist()
+    return dict(labels=array_data[0], values=array_data[1], type='pie')
+
+
+def columns(aggregates, window):
+    labels, amounts, _ = aggregates.by['location'].window(window)
+    return dict(labels=labels, values=amounts, type='pie')
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = [(location, 1000.0 * i + 0.5) for i, location in enumerate(locations)]
+
+    aggregates = WindowedAggregates(5, (60, 300, 900))
+    partials = {'location': {location: (amount, 10) for location, amount in rows}, 'type': {}}
+    for _ in range(200):
+        aggregates.add(partials)
+
+    print("legacy values: {}".format(legacy(rows)['values'][:2]))
+    print("column values: {}".format(columns(aggregates, 0)['values'][:2]))
+    for name, statement in [("legacy np.transpose", lambda: legacy(rows)),
+                            ("columns (last batch)", lambda: columns(aggregates, 0)),
+                            ("columns (15 min window)", lambda: columns(aggregates, 900)),
+                            ("aggregates.add (3 windows)", lambda: aggregates.add(partials))]:
+        seconds = timeit.timeit(statement, number=number)
+        print("{:<28} {:>8.2f} us/batch".format(name, seconds / number * 1e6))
@@ -0,0 +1,35 @@
+"""
+Location resolution throughput: points of the generated dataset resolved to their street or square
+
+usage (from the repository root):
+    python -m benchmarks.regions [points]
+"""
+import sys
+import time
+
+import numpy as np
+
+from dataset.generator import generate_gps_points
+from pipeline.regions import LocationResolver, notebook_regions
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    latitude, longitude, locations = generate_gps_points(np.random.default_rng(0), n)
+
+    start = time.perf_counter()
+    resolver = LocationResolver(notebook_regions())
+    print("index: {} cells, {:.0%} resolved without a polygon test, built in {:.2f}s".format(
+        resolver.shape[0] * resolver.shape[1], (resolver.full >= 0).mean(), time.perf_counter() - start))
+
+    for batch in (1000, 10000, n):
+        start = time.perf_counter()
+        for i in range(0, n, batch):
+            resolver.names(latitude[i:i + batch], longitude[i:i + batch])
+        elapsed = time.perf_counter() - start
+        print("batches of {:>9,} {:>14,.0f} lookups/s".format(batch, n / elapsed))
+
+    # the generator's own label only differs where zones overlap (the first one listed wins) or for
+    # 'Other' points that happen to fall on a street
+    agreement = (np.asarray(resolver.names(latitude, longitude)) == np.asarray(locations)).mean()
+    print("same location as the generator: {:.2%}".format(agreement))
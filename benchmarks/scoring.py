@@ -0,0 +1,40 @@
+"""
+Per-batch fraud scoring latency and throughput of 'SparkScorer'
+
+usage (from the repository root):
+    python -m benchmarks.scoring [master] [batch sizes...]
+
+e.g. python -m benchmarks.scoring local[4] 1000 10000 100000
+"""
+import sys
+
+from pyspark.sql import SparkSession
+
+from benchmarks.parsing import generate_lines
+from pipeline.parser import parse_rdd_to_dataframe
+from pipeline.scoring import SparkScorer
+
+
+def run(master, batch_sizes, repeat=5):
+    spark = SparkSession.builder.master(master).appName("ScoringBenchmark").getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+    scorer = SparkScorer()
+
+    print("{:>10} {:>12} {:>16}".format("batch", "latency (s)", "transactions/s"))
+    for size in batch_sizes:
+        transactions = parse_rdd_to_dataframe(spark, spark.sparkContext.parallelize(generate_lines(size))).cache()
+        transactions.count()
+        for _ in range(repeat):
+            scorer.score(transactions).unpersist()
+        best = min(scorer.stats, key=lambda stats: stats.seconds)
+        print("{:>10} {:>12.4f} {:>16,.0f}".format(size, best.seconds, best.rows / best.seconds))
+        scorer.stats.clear()
+        transactions.unpersist()
+
+    spark.stop()
+
+
+if __name__ == '__main__':
+    master = sys.argv[1] if len(sys.argv) > 1 else "local[2]"
+    sizes = [int(size) for size in sys.argv[2:]] or [1000, 10000, 100000]
+    run(master, sizes)
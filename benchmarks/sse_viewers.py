@@ -0,0 +1,100 @@
+"""
+Load test of the '/stream/events' Server-Sent Events endpoint: how many viewers one worker can serve
+
+Start the Flask app first (a single, threaded worker: every viewer holds one thread), e.g.:
+    cd flask_app && python app.py
+
+then (from the repository root):
+    python -m benchmarks.sse_viewers [url] [--viewers 10,100,500,1000] [--rate 5] [--events 50]
+
+For every number of viewers, events are published at 'rate' per second and each viewer measures the
+delay between publication and reception. The run stops at the first level where viewers miss events or
+the p99 delay exceeds one second.
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.parse
+import urllib.request
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+async def connect(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write("GET {} HTTP/1.1\r\nHost: {}\r\nAccept: text/event-stream\r\n\r\n".format(path, host).encode())
+    await writer.drain()
+    return reader, writer
+
+
+async def viewer(reader, writer, delays, expected):
+    received = 0
+    try:
+        while received < expected:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b'data: '):
+                sent = json.loads(line[6:])['sent']
+                # the warm-up events (sent = 0) are not timed
+                if sent:
+                    delays.append(time.time() - sent)
+                    received += 1
+    finally:
+        writer.close()
+    return received
+
+
+def publish(url, sent):
+    body = json.dumps({'event': 'benchmark', 'data': {'sent': sent}}).encode()
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+async def run_level(url, viewers, rate, events):
+    parsed = urllib.parse.urlparse(url)
+    delays = []
+    connections = await asyncio.gather(*(connect(parsed.hostname, parsed.port or 80, parsed.path)
+                                         for _ in range(viewers)))
+    tasks = [asyncio.create_task(viewer(reader, writer, delays, events)) for reader, writer in connections]
+    # wait until the server has a thread streaming to every viewer
+    loop = asyncio.get_running_loop()
+    while (await loop.run_in_executor(None, publish, url, 0.0))['clients'] < viewers:
+        await asyncio.sleep(0.1)
+
+    start = time.time()
+    for i in range(events):
+        await asyncio.sleep(max(0.0, start + i / rate - time.time()))
+        await loop.run_in_executor(None, publish, url, time.time())
+    done, pending = await asyncio.wait(tasks, timeout=10)
+    for task in pending:
+        task.cancel()
+
+    delivered = sum(task.result() for task in done if not task.cancelled() and task.exception() is None)
+    return delivered / float(viewers * events), percentile(delays, 0.5), percentile(delays, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE viewers load test")
+    parser.add_argument('url', nargs='?', default='http://localhost:5000/stream/events')
+    parser.add_argument('--viewers', default='10,100,250,500,1000')
+    parser.add_argument('--rate', type=float, default=5)
+    parser.add_argument('--events', type=int, default=50)
+    args = parser.parse_args()
+
+    print("{:>8} {:>10} {:>10} {:>10}".format("viewers", "delivered", "p50 (s)", "p99 (s)"))
+    for viewers in [int(v) for v in args.viewers.split(',')]:
+        delivered, p50, p99 = asyncio.run(run_level(args.url, viewers, args.rate, args.events))
+        print("{:>8} {:>9.1%} {:>10.4f} {:>10.4f}".format(viewers, delivered, p50, p99))
+        if delivered < 0.99 or p99 > 1.0:
+            print("saturated at {} viewers".format(viewers))
+            break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Sustained throughput of the DStream app vs the Structured Streaming app at local[N]
+
+The replay server is fed synthetic transactions as fast as the pipeline takes them ('block' policy) and
+the pipeline publishes to counting in-memory sinks; the rate is measured after a warm-up.
+
+usage (from the repository root):
+    python -m benchmarks.streaming [dstream|structured|both] [--master local[4]] [--duration 60] [--warmup 15]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.parsing import generate_lines
+from plot.sinks import MemorySink
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'flask_app', 'web_app', 'scripts'))
+from replay import ReplayServer, BLOCK  # noqa: E402
+
+
+class CountingSink(MemorySink):
+    """Counts the transactions (map points) that made it through the pipeline"""
+
+    def __init__(self):
+        super().__init__(maxlen=1)
+        self.points = 0
+
+    def _write(self, update):
+        super()._write(update)
+        self.points += len(update.get('lat', ()))
+
+
+def start_source(port, subscribers, lines, batch=1000):
+    """Replay 'lines' in a loop from a background thread, as fast as the subscribers consume them"""
+    encoded = ['{}\n'.format(line).encode('utf-8') for line in lines]
+
+    async def replay():
+        server = await ReplayServer('localhost', port, buffer_size=100000, policy=BLOCK).start()
+        await server.wait_for_subscribers(subscribers)
+        while True:
+            for i in range(0, len(encoded), batch):
+                await server.publish(encoded[i:i + batch])
+
+    thread = threading.Thread(target=asyncio.run, args=(replay(),), daemon=True)
+    thread.start()
+    return thread
+
+
+def measure(sink, duration, warmup):
+    time.sleep(warmup)
+    start, points = time.time(), sink.points
+    time.sleep(duration)
+    return (sink.points - points) / (time.time() - start)
+
+
+def run(mode, master, duration, warmup, port):
+    from pyspark.sql import SparkSession
+
+    spark = SparkSession.builder.master(master).appName("StreamingBenchmark").getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+    sinks = {'map': CountingSink(), 'pie': MemorySink(maxlen=1), 'alerts': MemorySink(maxlen=1)}
+
+    if mode == 'dstream':
+        from spark_streaming_transactions_app import create_stream
+        start_source(port, 1, generate_lines(100000))
+        ssc = create_stream(spark, 5, sinks, endpoints=[('localhost', port)])
+        ssc.start()
+        rate = measure(sinks['map'], duration, warmup)
+        ssc.stop(stopSparkContext=False, stopGraceFully=False)
+    else:
+        from spark_structured_streaming_transactions_app import create_queries
+        start_source(port, 2, generate_lines(100000))
+        queries = create_queries(spark, 5, sinks, endpoints=[('localhost', port)])
+        rate = measure(sinks['map'], duration, warmup)
+        for query in queries:
+            query.stop()
+
+    print("{:<11} {:<10} {:>12,.0f} transactions/s".format(mode, master, rate))
+    spark.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="DStream vs Structured Streaming throughput")
+    parser.add_argument('mode', nargs='?', choices=['dstream', 'structured', 'both'], default='both')
+    parser.add_argument('--master', default='local[2]')
+    parser.add_argument('--duration', type=int, default=60)
+    parser.add_argument('--warmup', type=int, default=15)
+    parser.add_argument('--port', type=int, default=5990)
+    args = parser.parse_args()
+
+    if args.mode == 'both':
+        # one JVM per mode, so neither run inherits the other's state
+        for mode in ('dstream', 'structured'):
+            subprocess.check_call([sys.executable, '-m', 'benchmarks.streaming', mode, '--master', args.master,
+                                   '--duration', str(args.duration), '--warmup', str(args.warmup),
+                                   '--port', str(args.port)])
+    else:
+        run(args.mode, args.master, args.duration, args.warmup, args.port)
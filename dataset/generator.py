@@ -0,0 +1,186 @@
+"""
+Seedable, chunked generator of the GPS-enriched PaySim dataset (vectorized version of the notebook)
+
+usage (from the repository root):
+    python -m dataset.generator <output dir> [--source PS_..._log.csv] [--transactions N] [--format csv|parquet]
+
+With '--source' the PaySim log is enriched chunk by chunk, otherwise PaySim-like transactions are
+synthesized, so datasets 10x-100x larger than the original can be produced in bounded memory.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline.schema import columns
+
+number_of_people = 636262
+number_of_transactions = 6362620
+street_points_percentage = 0.15
+square_points_percentage = 0.2
+
+london_coordinates = (51.5073509, -0.12775829999998223)
+
+street_points_def = [
+    [(51.507306, -0.140064), (51.509734, -0.132921), "Jermyn Street"],
+    [(51.513534, -0.157751), (51.516433, -0.130584), "Oxford Street"],
+    [(51.509980, -0.137049), (51.516591, -0.142516), "Regent Street"],
+    [(51.513695, -0.139419), (51.512300, -0.137901), "Carnaby Street"]
+]
+
+square_points_def = [
+    [(51.507311, -0.221633), 0.0001, "Westfield London"],
+    [london_coordinates, 0.1, "Other"]
+]
+
+locations = [p[2] for p in street_points_def + square_points_def]
+location_weights = np.array([street_points_percentage] * len(street_points_def) +
+                            [square_points_percentage] * len(square_points_def))
+location_weights = location_weights / location_weights.sum()
+
+# PaySim transaction type frequencies and fraud rate (fraud only happens in TRANSFER and CASH_OUT)
+types = ['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
+type_weights = np.array([0.2199, 0.3517, 0.0065, 0.3381, 0.0838])
+type_weights = type_weights / type_weights.sum()
+fraud_rate = 0.0029
+steps = 743
+
+
+def generate_gps_points(rng, n):
+    """
+    Sample 'n' (latitude, longitude, location) points, the vectorized equivalent of
+    'generate_street_points' + 'generate_square_points' + shuffle
+
+    Each row picks a zone with the notebook's proportions, then a uniform point along the street segment
+    or inside the square around its center.
+    """
+    zone = rng.choice(len(locations), size=n, p=location_weights)
+    latitude = np.empty(n)
+    longitude = np.empty(n)
+
+    for i, (p1, p2, _) in enumerate(street_points_def):
+        rows = np.flatnonzero(zone == i)
+        m = (p2[1] - p1[1]) / (p2[0] - p1[0])
+        b = p2[1] - m * p2[0]
+        latitude[rows] = p1[0] + (p2[0] - p1[0]) * rng.random(rows.size)
+        longitude[rows] = latitude[rows] * m + b
+
+    for i, (center, radius, _) in enumerate(square_points_def, len(street_points_def)):
+        rows = np.flatnonzero(zone == i)
+        latitude[rows] = center[0] + rng.uniform(-radius, radius, rows.size)
+        longitude[rows] = center[1] + rng.uniform(-radius, radius, rows.size)
+
+    return latitude, longitude, pd.Categorical.from_codes(zone, locations)
+
+
+def generate_people(rng, n, p=number_of_people):
+    return pd.Series(rng.integers(0, p, n)).astype(str)
+
+
+def _names(rng, prefix, n):
+    return prefix + pd.Series(rng.integers(10 ** 8, 2 * 10 ** 9, n)).astype(str)
+
+
+def synthesize_paysim(rng, first, n, total):
+    """PaySim-like rows 'first'..'first + n' of a 'total' rows dataset ('step' grows with the row index)"""
+    type_codes = rng.choice(len(types), size=n, p=type_weights)
+    type_ = pd.Categorical.from_codes(type_codes, types)
+    amount = np.round(rng.lognormal(11.2, 1.33, n), 2)
+
+    old_balance_orig = np.where(rng.random(n) < 0.33, 0.0, np.round(rng.lognormal(10.5, 2.0, n), 2))
+    cash_in = type_codes == types.index('CASH_IN')
+    new_balance_orig = np.where(cash_in, old_balance_orig + amount, np.maximum(old_balance_orig - amount, 0.0))
+
+    merchant = type_codes == types.index('PAYMENT')
+    old_balance_dest = np.where(merchant, 0.0, np.round(rng.lognormal(12.5, 2.0, n), 2))
+    new_balance_dest = np.where(merchant, 0.0, np.where(cash_in, np.maximum(old_balance_dest - amount, 0.0),
+                                                        old_balance_dest + amount))
+
+    can_be_fraud = (type_codes == types.index('TRANSFER')) | (type_codes == types.index('CASH_OUT'))
+    is_fraud = can_be_fraud & (rng.random(n) < fraud_rate / (type_weights[1] + type_weights[4]))
+    is_flagged = is_fraud & (type_codes == types.index('TRANSFER')) & (amount >= 10 ** 7)
+
+    name_dest = np.where(merchant, _names(rng, 'M', n), _names(rng, 'C', n))
+
+    return pd.DataFrame({
+        'step': 1 + (np.arange(first, first + n) * steps) // total,
+        'type': type_,
+        'amount': amount,
+        'nameOrig': _names(rng, 'C', n),
+        'oldbalanceOrg': old_balance_orig,
+        'newbalanceOrig': new_balance_orig,
+        'nameDest': name_dest,
+        'oldbalanceDest': old_balance_dest,
+        'newbalanceDest': new_balance_dest,
+        'isFraud': is_fraud.astype(np.int8),
+        'isFlaggedFraud': is_flagged.astype(np.int8),
+    })
+
+
+def complete_df(df, rng, first, people=number_of_people):
+    """Add the GPS, location, id and entity_id columns to a chunk of PaySim rows starting at row 'first'"""
+    latitude, longitude, location = generate_gps_points(rng, len(df))
+    df["gps_latitude"] = latitude
+    df["gps_longitude"] = longitude
+    df["location"] = location
+    df["id"] = np.arange(first, first + len(df))
+    df["entity_id"] = generate_people(rng, len(df), people).values
+    return df[columns]
+
+
+def generate_chunks(n=number_of_transactions, source=None, chunk_size=1000000, seed=0, people=number_of_people):
+    """
+    Yield the enriched dataset as DataFrames of at most 'chunk_size' rows
+
+    Every chunk draws from its own child of SeedSequence(seed), so the output only depends on
+    (seed, chunk_size) and memory is bounded by one chunk.
+    """
+    seeds = np.random.SeedSequence(seed)
+    if source is not None:
+        chunks = pd.read_csv(source, chunksize=chunk_size, nrows=n)
+    else:
+        chunks = (None for _ in range(0, n, chunk_size))
+
+    first = 0
+    for chunk, child in zip(chunks, seeds.spawn(n // chunk_size + 1)):
+        rng = np.random.default_rng(child)
+        if chunk is None:
+            chunk = synthesize_paysim(rng, first, min(chunk_size, n - first), n)
+        yield complete_df(chunk, rng, first, people)
+        first += len(chunk)
+
+
+def write_shards(chunks, output, format='parquet'):
+    """Write every chunk to its own shard 'part-<n>.<format>' in 'output', return the shard paths"""
+    os.makedirs(output, exist_ok=True)
+    paths = []
+    for i, chunk in enumerate(chunks):
+        path = os.path.join(output, "part-{:05d}.{}".format(i, format))
+        if format == 'parquet':
+            chunk.to_parquet(path, index=False)
+        elif format == 'csv':
+            chunk.to_csv(path, index=False)
+        else:
+            raise ValueError("Unknown shard format: {}".format(format))
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the GPS-enriched PaySim dataset")
+    parser.add_argument('output')
+    parser.add_argument('--source', help="PaySim log to enrich, synthesized when missing")
+    parser.add_argument('--transactions', type=int, default=number_of_transactions)
+    parser.add_argument('--people', type=int, default=number_of_people)
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.time()
+    shards = write_shards(generate_chunks(args.transactions, args.source, args.chunk_size, args.seed, args.people),
+                          args.output, args.format)
+    print("{} transactions written to {} shards in {:.1f}s".format(args.transactions, len(shards),
+                                                                   time.time() - start))
@@ -0,0 +1,61 @@
+"""
+Train the logistic regression the streaming apps use with '--features': the notebook's 8 raw features plus the
+per-entity features of 'pipeline.features', computed by replaying the dataset through a 'FeatureStore' in step
+order, as the stream would
+
+usage (from the repository root):
+    python -m dataset.train <dataset (csv, parquet or shards glob)> [--output data/models/...] [--batch 100000]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from dataset.split import read_dataset
+from pipeline.features import FeatureStore, entity_model_columns, state_columns
+from pipeline.scoring import entity_model_path
+
+
+def entity_features(df, batch=100000):
+    """
+    The dataset sorted by step, its entity features joined (first sightings 0, as 'enrich' fills them)
+
+    The rows go through the store 'batch' at a time, the way micro-batches do, without eviction.
+    """
+    df = df.sort_values('step', kind='stable').reset_index(drop=True)
+    df['id'] = df['id'].astype(str)
+    df['entity_id'] = df['entity_id'].astype(str)
+    store = FeatureStore(ttl=float('inf'), clock=lambda: 0.0)
+    features = pd.concat([store.update(df.loc[start:start + batch - 1, state_columns])
+                          for start in range(0, len(df), batch)])
+    return pd.concat([df, features.drop(columns='id').fillna(0.0)], axis=1)
+
+
+def train(spark, df, output=entity_model_path, threshold=0.01):
+    """Fit and save the model over 'entity_model_columns', the notebook's parameters otherwise"""
+    from pyspark.ml.classification import LogisticRegression
+    from pyspark.ml.feature import VectorAssembler
+
+    training = spark.createDataFrame(df[entity_model_columns + ['isFraud']].astype('float64'))
+    training = VectorAssembler(inputCols=entity_model_columns, outputCol='features').transform(training)
+    model = LogisticRegression(labelCol='isFraud', maxIter=1000, threshold=threshold).fit(training)
+    model.write().overwrite().save(output)
+    return model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the fraud model over the raw and per-entity features")
+    parser.add_argument('dataset')
+    parser.add_argument('--output', default=entity_model_path)
+    parser.add_argument('--batch', type=int, default=100000, help="rows per feature store update")
+    parser.add_argument('--master', default='local[*]')
+    args = parser.parse_args()
+
+    from pyspark.sql import SparkSession
+
+    start = time.time()
+    df = entity_features(read_dataset(args.dataset), args.batch)
+    spark = SparkSession.builder.master(args.master).appName("EntityModelTraining").getOrCreate()
+    model = train(spark, df, args.output)
+    print("model over {} features trained on {} transactions, written to {} in {:.1f}s".format(
+        model.numFeatures, len(df), args.output, time.time() - start))
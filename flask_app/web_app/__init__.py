@@ -7,6 +7,8 @@ swagger = Swagger()
 
 from web_app.config import profiles
 from web_app.controllers.streams import streams as streams_blueprint
+from web_app.controllers.events import events as events_blueprint
+from web_app.controllers.metrics import metrics as metrics_blueprint
 
 
 def create_app(config_name):
@@ -23,6 +25,8 @@ def create_app(config_name):
 
     #  register blueprints
     app.register_blueprint(streams_blueprint)
+    app.register_blueprint(events_blueprint)
+    app.register_blueprint(metrics_blueprint)
 
     swagger.init_app(app)
 
@@ -24,7 +24,7 @@ def get_data(path):
 properties_path_dev = 'resources/properties/config.yaml'
 
 with open(os.path.join(get_data(properties_path_dev))) as config_file:
-    config = yaml.load(config_file)
+    config = yaml.safe_load(config_file)
 
 
 
@@ -37,6 +37,21 @@ class Config:
     SQLALCHEMY_COMMIT_ON_TEARDOWN = True
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SWAGGER = template
+    #  streaming sessions, see web_app.utils.supervisor
+    SPARK_SUBMIT = os.environ.get('SPARK_SUBMIT') or 'spark-submit'
+    STREAMING_APP = os.environ.get('STREAMING_APP') or os.path.join(basedir, '..', '..',
+                                                                    'spark_streaming_transactions_app.py')
+    STREAMING_SINK = os.environ.get('STREAMING_SINK')
+    #  socket consumers the streaming app opens per source: the Structured Streaming app runs two queries
+    STREAM_SUBSCRIBERS = int(os.environ.get('STREAM_SUBSCRIBERS') or
+                             (2 if 'structured' in os.path.basename(STREAMING_APP) else 1))
+    TRANSACTIONS_SCRIPT = os.path.join(basedir, 'scripts', 'transactions.py')
+    TRANSACTIONS_DATA = os.environ.get('TRANSACTIONS_DATA') or os.path.join(basedir, '..', '..', 'data',
+                                                                            'transactions')
+    STREAM_BASE_PORT = int(os.environ.get('STREAM_BASE_PORT') or 5900)
+    STREAM_READY_TIMEOUT = float(os.environ.get('STREAM_READY_TIMEOUT') or 60)
+    #  where the streaming applications push their stage metrics, served back on GET /metrics
+    METRICS_URL = os.environ.get('METRICS_URL') or 'http://localhost:5000/metrics'
 
 
     @staticmethod
@@ -0,0 +1,55 @@
+from flask import Blueprint, Response, request, jsonify, abort, stream_with_context
+
+from web_app.utils.broadcast import Broadcaster
+
+events = Blueprint('events', __name__)
+
+broadcaster = Broadcaster()
+
+
+@events.route('/stream/events', methods=['GET'])
+def stream_events():
+    """
+    Live pipeline output as Server-Sent Events
+    ---
+    tags:
+      - events
+    produces:
+      - text/event-stream
+    responses:
+        200:
+            description: "Endless stream of 'locations', 'transactions', 'alerts', 'windows' and 'cells' events"
+    """
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(stream_with_context(broadcaster.subscribe(last_id)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@events.route('/stream/events', methods=['POST'])
+def publish_events():
+    """
+    Publish the aggregated output of a batch to every connected client
+    ---
+    tags:
+      - events
+    parameters:
+      - name: body
+        in: body
+        required: true
+        description: "{'event': <name>, 'data': <json>} or a list of them"
+    responses:
+        200:
+            description: Events published
+        422:
+            description: Malformed events
+    """
+    body = request.get_json(silent=True)
+    batch = body if isinstance(body, list) else [body]
+    if not all(isinstance(item, dict) and 'event' in item and 'data' in item for item in batch):
+        abort(422)
+
+    last_id = None
+    for item in batch:
+        last_id = broadcaster.publish(item['event'], item['data'])
+
+    return jsonify({"status": "published", "msg": "OK", "id": last_id, "clients": broadcaster.clients})
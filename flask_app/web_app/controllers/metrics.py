@@ -0,0 +1,67 @@
+from flask import Blueprint, Response, request, jsonify, abort
+
+from web_app.controllers.events import broadcaster
+from web_app.controllers.streams import supervisor
+from web_app.utils.metrics import MetricsStore, merge, render, source_families, valid_family
+
+metrics = Blueprint('metrics', __name__)
+
+store = MetricsStore()
+
+
+def web_families():
+    return {
+        'sse_clients': {"type": "gauge", "help": "Connected Server-Sent Events clients",
+                        "samples": [[{}, broadcaster.clients]]},
+        'sse_events_total': {"type": "counter", "help": "Events published to the Server-Sent Events clients",
+                             "samples": [[{}, broadcaster.last_id]]},
+    }
+
+
+@metrics.route('/metrics', methods=['GET'])
+def export_metrics():
+    """
+    Per-stage metrics of the replay sources, the streaming applications and the web app (Prometheus text format)
+    ---
+    tags:
+      - metrics
+    produces:
+      - text/plain
+    responses:
+        200:
+            description: "'replay_*' from the supervised sources, 'pipeline_*' pushed by Spark, 'sse_*'"
+    """
+    sources = [(name, source_families(status)) for name, status in supervisor.status().items()]
+    families = merge(*(sources + store.sources()))
+    families.update(web_families())
+    return Response(render(families), mimetype='text/plain; version=0.0.4')
+
+
+@metrics.route('/metrics', methods=['POST'])
+def push_metrics():
+    """
+    Latest metrics snapshot of a streaming application
+    ---
+    tags:
+      - metrics
+    parameters:
+      - name: body
+        in: body
+        required: true
+        description: "{'session': <name>, 'metrics': {<name>: {'type', 'help', 'samples'}}}"
+    responses:
+        200:
+            description: Snapshot stored
+        422:
+            description: "Malformed snapshot, e.g. a family of unknown type or with malformed samples"
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('session'), str) \
+            or not isinstance(body.get('metrics'), dict) \
+            or not all(isinstance(name, str) and valid_family(family) for name, family in body['metrics'].items()):
+        abort(422)
+
+    store.push(body['session'], body['metrics'])
+    supervisor.observe(body['session'], body['metrics'])
+
+    return jsonify({"status": "stored", "msg": "OK", "session": body['session']})
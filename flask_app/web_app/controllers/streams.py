@@ -1,17 +1,39 @@
+import atexit
 import os
-import signal
 import sys
-import time
-import subprocess
 
 from flask import Blueprint, current_app, request, url_for, jsonify, abort
 
-from web_app.netcat.netcat import Netcat
 from web_app.utils.decorators import parse_args
 from web_app.utils.flask import RequestParser, Parameter
+from web_app.utils.supervisor import Supervisor
 
 streams = Blueprint('stream', __name__)
 
+supervisor = Supervisor()
+
+#  no orphaned Spark drivers or replay servers once the web app is gone
+atexit.register(supervisor.stop_all)
+
+
+@streams.record_once
+def configure_supervisor(state):
+    supervisor.base_port = state.app.config.get('STREAM_BASE_PORT', supervisor.base_port)
+
+
+def source_cmd(frequency, journey_ids):
+    config = current_app.config
+    return lambda port: [sys.executable, config['TRANSACTIONS_SCRIPT'], str(frequency)] + \
+        [str(x) for x in journey_ids] + ['--port', str(port), '--data', config['TRANSACTIONS_DATA'],
+                                        '--report-interval', '1', '--subscribers', str(config['STREAM_SUBSCRIBERS'])]
+
+
+def spark_cmd(name):
+    config = current_app.config
+    sink = ['--sink', config['STREAMING_SINK']] if config['STREAMING_SINK'] else []
+    return lambda port: [config['SPARK_SUBMIT'], config['STREAMING_APP'], '--sources', 'localhost:{}'.format(port),
+                         '--metrics-url', config['METRICS_URL'], '--session', name] + sink
+
 
 @streams.route('/')
 def index():
@@ -21,11 +43,12 @@ def index():
 @streams.route('/stream/start/transactions', methods=['GET'])
 @parse_args(RequestParser.withParameters(
     Parameter('speed', type=str, required=True),
-    Parameter('transactions', type=str, required=True))
+    Parameter('transactions', type=str, required=True),
+    Parameter('name', type=str, required=False))
 )
-def start_stream_transactions(speed, transactions):
+def start_stream_transactions(speed, transactions, name='transactions'):
     """
-    Start 'Transactions' streaming process
+    Start a 'Transactions' streaming session, returns before the processes are up
     ---
     tags:
       - streams
@@ -39,9 +62,16 @@ def start_stream_transactions(speed, transactions):
         in: query
         description: Transaction IDs (comma separated)
         required: true
+      - name: name
+        in: query
+        description: Session name, several sessions can run side by side
+        required: false
+        default: transactions
     responses:
-        200:
-            description: Streaming operation done
+        202:
+            description: Session starting, follow it on /stream/status/<name>
+        409:
+            description: A session with this name is already running
     """
     frequency = 1.0 / float(speed.strip().replace('x', ''))
 
@@ -49,36 +79,76 @@ def start_stream_transactions(speed, transactions):
 
     print('Transactions: {} with speed: {} x'.format(str(journey_ids), str(frequency)))
 
-    #  launch spark streaming app
-    cmd = '/Users/joaoneves/Tools/spark-2.2.0-bin-hadoop2.7/bin/spark-submit spark_streaming_transactions_app.py'
-    p_spark = subprocess.Popen(cmd.split(" "))
-    print("Process ID of Spark Streaming subprocess %s" % p_spark.pid)
+    config = current_app.config
+    try:
+        session = supervisor.start(name, source_cmd(frequency, journey_ids), spark_cmd(name),
+                                   cwd=os.path.dirname(os.path.abspath(config['STREAMING_APP'])),
+                                   ready_timeout=config['STREAM_READY_TIMEOUT'])
+    except KeyError:
+        abort(409)
 
-    time.sleep(5)
+    return jsonify({"status": session.state, "msg": "OK", "name": name, "port": session.port,
+                    "url": url_for('stream.stream_status', name=name)}), 202
 
-    script = '/Users/joaoneves/Documents/demo-iot-transactions/flask_app/web_app/scripts/transactions.py'
-    p = subprocess.Popen(["python", script, str(frequency)] + [str(x) for x in journey_ids])
-    print("Process ID of Source subprocess %s" % p.pid)
 
-    current_app.PID_SPARK_STREAMING_TRANSACTIONS = p_spark.pid
-    current_app.PID_TRANSACTIONS = p.pid
+@streams.route('/stream/status', methods=['GET'])
+def streams_status():
+    """
+    Status of every streaming session
+    ---
+    tags:
+      - streams
+    responses:
+        200:
+            description: "State, throughput and lag of each session, by name"
+    """
+    return jsonify(supervisor.status())
 
-    return jsonify({"status": "streaming", "msg": "OK"})
+
+@streams.route('/stream/status/<name>', methods=['GET'])
+def stream_status(name):
+    """
+    Status of a streaming session
+    ---
+    tags:
+      - streams
+    parameters:
+      - name: name
+        in: path
+        required: true
+    responses:
+        200:
+            description: "State ('starting', 'running', 'stopped' or 'failed'), throughput and lag"
+        404:
+            description: Unknown session
+    """
+    status = supervisor.status(name)
+    if status is None:
+        abort(404)
+    return jsonify(status)
 
 
 @streams.route('/stream/stop/transactions', methods=['DELETE'])
 def stop_stream_transactions():
     """
-    Stop 'Transactions' streaming process
+    Stop a 'Transactions' streaming session, its processes and all of their children
     ---
     tags:
       - streams
+    parameters:
+      - name: name
+        in: query
+        required: false
+        default: transactions
     responses:
         200:
             description: Streaming operation completed
+        404:
+            description: Unknown session
     """
-    os.kill(current_app.PID_TRANSACTIONS, signal.SIGTERM)
-    os.kill(current_app.PID_SPARK_STREAMING_TRANSACTIONS, signal.SIGTERM)
+    name = request.args.get('name', 'transactions')
+    codes = supervisor.stop(name)
+    if codes is None:
+        abort(404)
 
-    return jsonify({"status": "Streaming process stopped", "msg": "OK",
-                    "pid": [current_app.PID_TRANSACTIONS, current_app.PID_SPARK_STREAMING_TRANSACTIONS]})
+    return jsonify({"status": "Streaming process stopped", "msg": "OK", "name": name, "exit_codes": codes})
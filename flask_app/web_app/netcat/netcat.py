@@ -1,27 +1,37 @@
-import socket
+import asyncio
+import threading
 
+from web_app.scripts.replay import ReplayServer, DROP_OLDEST
 
-class Netcat:
-    """ Python 'netcat like' module """
-
-    def __init__(self, ip, port):
-
-        s = socket.socket()
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
-        host = ip
-        port = port
+class Netcat:
+    """
+    Python 'netcat like' module
 
-        s.bind((host, port))
+    Blocking facade over the asyncio 'ReplayServer' running on a background thread: the constructor
+    still waits for a first consumer, but any number of consumers can attach and a slow one no longer
+    stalls 'write'.
+    """
 
-        print("Listening on port: %s" % str(port))
+    def __init__(self, ip, port, buffer_size=10000, policy=DROP_OLDEST):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
 
-        s.listen(5)
+        self.server = ReplayServer(host=ip, port=port, buffer_size=buffer_size, policy=policy)
+        self._run(self.server.start())
+        self._run(self.server.wait_for_subscribers())
 
-        self.socket, addr = s.accept()
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
 
     def write(self, data):
-        self.socket.send(data.encode('utf-8'))
+        self.writelines(data.splitlines())
+
+    def writelines(self, lines):
+        self._run(self.server.publish(lines))
 
     def close(self):
-        self.socket.close()
+        self._run(self.server.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
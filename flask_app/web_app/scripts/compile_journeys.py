@@ -0,0 +1,19 @@
+"""
+Compile transaction journeys into a memory-mapped store for 'transactions.py --store'
+
+usage:
+    python compile_journeys.py '<data dir>/transactions' journeys.bin
+
+Journey ids are the ones of the directory's 'JourneyCatalog', as in 'transactions.py'.
+"""
+import sys
+import time
+
+from replay import JourneyCatalog, compile_journeys
+
+directory, path = sys.argv[1], sys.argv[2]
+
+start = time.time()
+catalog = JourneyCatalog(directory)
+compile_journeys({id: catalog.lines(id) for id in catalog.journeys}, path)
+print("Compiled {} journeys into {} in {:.1f}s".format(len(catalog), path, time.time() - start))
@@ -0,0 +1,4 @@
+from .server import ReplayServer, Subscriber, DROP_OLDEST, BLOCK
+from .scheduler import RateScheduler, TimestampScheduler
+from .store import JourneyStore, compile_journeys
+from .catalog import JourneyCatalog, Journey, read_all, read_lines
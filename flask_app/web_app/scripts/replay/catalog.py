@@ -0,0 +1,105 @@
+import glob
+import json
+import os
+import re
+from collections import namedtuple
+
+Journey = namedtuple('Journey', 'id path rows size mtime')
+
+
+def read_all(pattern):
+    def extract_int_from_file(file):
+        match = re.search(r"_(?P<int>\d+)\.csv", file)
+        if match:
+            return int(match.group("int"))
+
+    files = glob.glob(pattern)
+    return sorted(files, key=extract_int_from_file)
+
+
+def count_rows(path, chunk_size=1 << 20):
+    """Data rows of a CSV file (header excluded), counted over raw binary chunks"""
+    rows, last = 0, b'\n'
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            rows += chunk.count(b'\n')
+            last = chunk[-1:]
+    # a last line without its newline still counts
+    return rows + (last != b'\n') - 1
+
+
+def read_lines(path, buffer_size=1 << 20):
+    """
+    Stream the data lines of a journey file as they are on disk (no parsing, no re-serialization)
+
+    The file is only opened on the first 'next' and closed as soon as it is exhausted.
+    """
+    with open(path, buffering=buffer_size) as f:
+        next(f, None)
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line:
+                yield line
+
+
+class JourneyCatalog:
+    """
+    Index of the journey files: id -> path, row count, byte size and modification time (ns)
+
+    Journey ids are the positions of the files sorted by their numeric suffix. Only the files' metadata is
+    read up front; a journey's rows are counted the first time it is looked up, and persisted next to the
+    files ('catalog.json') under its (mtime, size): a file edited in place is counted again, the others are
+    not reopened by later starts.
+    """
+
+    filename = 'catalog.json'
+
+    def __init__(self, directory, pattern='transactions_*.csv'):
+        self.directory = directory
+        self.pattern = pattern
+        self.path = os.path.join(directory, self.filename)
+        cached = self._load()
+        self.journeys = {}
+        for i, file in enumerate(read_all(os.path.join(directory, pattern))):
+            stat = os.stat(file)
+            entry = cached.get(os.path.basename(file))
+            fresh = entry is not None and (entry['mtime'], entry['size']) == (stat.st_mtime_ns, stat.st_size)
+            self.journeys[i] = Journey(i, file, entry['rows'] if fresh else None, stat.st_size, stat.st_mtime_ns)
+
+    def _load(self):
+        """{file name: {'rows', 'size', 'mtime'}} of the persisted catalog, empty when missing or unreadable"""
+        try:
+            with open(self.path) as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(catalog, dict) or catalog.get('pattern') != self.pattern \
+                or not isinstance(catalog.get('files'), dict):
+            return {}
+        return catalog['files']
+
+    def save(self):
+        files = {os.path.basename(journey.path): {'rows': journey.rows, 'size': journey.size, 'mtime': journey.mtime}
+                 for journey in self.journeys.values() if journey.rows is not None}
+        try:
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump({'pattern': self.pattern, 'files': files}, f)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError as e:
+            print("Journey catalog not persisted: {}".format(e))
+
+    def __contains__(self, id):
+        return id in self.journeys
+
+    def __getitem__(self, id):
+        journey = self.journeys[id]
+        if journey.rows is None:
+            journey = self.journeys[id] = journey._replace(rows=count_rows(journey.path))
+            self.save()
+        return journey
+
+    def __len__(self):
+        return len(self.journeys)
+
+    def lines(self, id):
+        return read_lines(self.journeys[id].path)
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+
+class Scheduler:
+    """
+    Deadline based pacing shared by the replay schedulers
+
+    Deadlines are computed from the start of the replay, never from the previous send, so serialization
+    and socket time do not accumulate as drift. When the replay falls behind, the missed events are
+    released at once (catch-up burst).
+    """
+
+    def __init__(self, report_interval=10.0, clock=time.monotonic):
+        self.report_interval = report_interval
+        self.clock = clock
+        self.start = None
+        self.sent = 0
+        self.late = 0.0
+        # events the schedule gave up on to stay within the catch-up burst
+        self.skipped = 0
+        self._reported = None
+
+    def _begin(self):
+        if self.start is None:
+            self.start = self._reported = self.clock()
+
+    async def _sleep_until(self, deadline):
+        delay = deadline - self.clock()
+        if delay > 0:
+            self.late = 0.0
+            await asyncio.sleep(delay)
+        else:
+            self.late = -delay
+
+    def record(self, n):
+        """Account for 'n' events actually sent"""
+        self.sent += n
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.start if self.start is not None else 0.0
+
+    @property
+    def achieved_rate(self):
+        elapsed = self.elapsed
+        return self.sent / elapsed if elapsed else 0.0
+
+    def report(self):
+        return {"sent": self.sent, "elapsed": round(self.elapsed, 3), "achieved_rate": round(self.achieved_rate, 1),
+                "late": round(self.late, 4), "skipped": self.skipped}
+
+    def should_report(self):
+        if self._reported is not None and self.clock() - self._reported >= self.report_interval:
+            self._reported = self.clock()
+            return True
+        return False
+
+
+class RateScheduler(Scheduler):
+    """
+    Hold a constant target rate (events/sec): event i is due at start + i / rate
+
+    When the replay is so far behind that more than 'max_burst' events are overdue, the oldest ones are
+    skipped (counted in 'skipped', still part of the schedule) rather than the origin moved, so 'start' stays
+    the origin of the achieved rate. 'late' is how far behind the schedule the replay is, before any skip.
+
+    e.g.:
+        scheduler = RateScheduler(1000)
+        n = await scheduler.acquire()   # how many events may be sent now
+        ... send n events ...
+        scheduler.record(n)
+    """
+
+    def __init__(self, rate, max_burst=None, max_batch=1024, **kw):
+        if rate <= 0:
+            raise ValueError("Target rate must be positive: {}".format(rate))
+        self.rate = float(rate)
+        self.max_batch = max_batch
+        # by default at most one second worth of events is caught up, older backlog is skipped
+        self.max_burst = max_burst or max(1, int(self.rate))
+        super().__init__(**kw)
+
+    async def acquire(self):
+        self._begin()
+        # events already sent or skipped
+        scheduled = self.sent + self.skipped
+        due = int((self.clock() - self.start) * self.rate) - scheduled
+        if due <= 0:
+            await self._sleep_until(self.start + (scheduled + 1) / self.rate)
+            due = max(1, int((self.clock() - self.start) * self.rate) - scheduled)
+        else:
+            # time since the oldest pending event was due
+            self.late = max(0.0, self.clock() - self.start - (scheduled + 1) / self.rate)
+        if due > self.max_burst:
+            # too far behind: skip the backlog so that only 'max_burst' events remain overdue
+            self.skipped += due - self.max_burst
+            due = self.max_burst
+        return min(due, self.max_batch)
+
+    def report(self):
+        # seconds of target rate the replay is short of since the start, skipped events included
+        behind = max(0.0, self.elapsed - self.sent / self.rate)
+        return dict(super().report(), target_rate=self.rate, behind=round(behind, 3))
+
+
+class TimestampScheduler(Scheduler):
+    """
+    Replay events at a multiple of their original timestamps
+
+    PaySim 'step' is an hour of simulated time ('unit' = 3600 seconds): with speed=3600 one step is replayed
+    per second. Event timestamps must be non decreasing.
+    """
+
+    def __init__(self, speed, unit=3600.0, **kw):
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive: {}".format(speed))
+        self.speed = float(speed)
+        self.unit = float(unit)
+        self.origin = None
+        self.timestamp = None
+        super().__init__(**kw)
+
+    def deadline(self, timestamp):
+        return self.start + (timestamp - self.origin) * self.unit / self.speed
+
+    async def wait_until(self, timestamp):
+        """Wait until an event stamped 'timestamp' is due"""
+        self._begin()
+        if self.origin is None:
+            self.origin = timestamp
+        self.timestamp = timestamp
+        await self._sleep_until(self.deadline(timestamp))
+
+    @property
+    def target_rate(self):
+        """Rate the original timestamps call for, so far"""
+        if self.timestamp is None or self.timestamp == self.origin:
+            return 0.0
+        return self.sent / ((self.timestamp - self.origin) * self.unit / self.speed)
+
+    def report(self):
+        return dict(super().report(), speed=self.speed, target_rate=round(self.target_rate, 1))
@@ -0,0 +1,247 @@
+import asyncio
+import time
+from collections import deque
+
+DROP_OLDEST = 'drop-oldest'
+BLOCK = 'block'
+
+# what a consumer sends right after connecting to ask for a binary framing, and what the server answers
+HELLO = b'FRAMING '
+
+
+class Subscriber:
+    """
+    One connected consumer: a bounded buffer of encoded lines drained by its own writer task
+
+    With the 'drop-oldest' policy a full buffer discards its oldest lines, so a slow consumer never
+    stalls the producer. With 'block' the producer waits until there is room again.
+
+    A consumer that negotiated a binary 'framing' buffers whole frames instead, still bounded and counted
+    in lines (transactions).
+    """
+
+    def __init__(self, writer, buffer_size, policy):
+        self.writer = writer
+        self.framing = None
+        self.buffer = deque()
+        # lines held by the buffered frames
+        self.buffered = 0
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.has_data = asyncio.Event()
+        self.has_room = asyncio.Event()
+        self.has_room.set()
+        self.sent = 0
+        self.dropped = 0
+        self.writes = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self.closing = False
+        self.closed = False
+        self.task = None
+
+    @property
+    def peer(self):
+        return self.writer.get_extra_info('peername')
+
+    async def put(self, lines):
+        if self.closing or self.closed:
+            return
+        if self.policy == BLOCK:
+            for line in lines:
+                while len(self.buffer) >= self.buffer_size and not self.closed:
+                    # the writer must see what is already buffered, or a batch larger than the buffer never drains
+                    self.has_data.set()
+                    self.has_room.clear()
+                    await self.has_room.wait()
+                self.buffer.append(line)
+        else:
+            overflow = len(self.buffer) + len(lines) - self.buffer_size
+            if overflow > 0:
+                self.dropped += overflow
+                for _ in range(min(overflow, len(self.buffer))):
+                    self.buffer.popleft()
+                lines = lines[-self.buffer_size:]
+            self.buffer.extend(lines)
+        self.has_data.set()
+
+    async def put_frame(self, frame, lines):
+        """A frame of 'lines' transactions, never split: 'drop-oldest' drops whole frames"""
+        if self.closing or self.closed:
+            return
+        if self.policy == BLOCK:
+            while self.buffered and self.buffered + lines > self.buffer_size and not self.closed:
+                self.has_data.set()
+                self.has_room.clear()
+                await self.has_room.wait()
+        else:
+            while self.buffer and self.buffered + lines > self.buffer_size:
+                _, dropped = self.buffer.popleft()
+                self.buffered -= dropped
+                self.dropped += dropped
+        self.buffer.append((frame, lines))
+        self.buffered += lines
+        self.has_data.set()
+
+    async def run(self, max_batch):
+        """Write whatever is buffered with a single 'writelines' and wait for the socket to drain"""
+        self.task = asyncio.current_task()
+        try:
+            while True:
+                await self.has_data.wait()
+                if not self.buffer:
+                    if self.closing:
+                        break
+                    self.has_data.clear()
+                    continue
+                batch = [self.buffer.popleft() for _ in range(min(max_batch, len(self.buffer)))]
+                lines = len(batch)
+                if self.framing:
+                    batch, counts = zip(*batch)
+                    lines = sum(counts)
+                    self.buffered -= lines
+                self.has_room.set()
+                start = time.perf_counter()
+                self.writer.writelines(batch)
+                await self.writer.drain()
+                elapsed = time.perf_counter() - start
+                self.sent += lines
+                self.writes += 1
+                self.write_seconds += elapsed
+                self.max_write_seconds = max(self.max_write_seconds, elapsed)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.closed = True
+            self.has_room.set()
+            self.writer.close()
+
+    def close(self):
+        """Flush what is buffered and disconnect"""
+        self.closing = True
+        self.has_data.set()
+
+
+class ReplayServer:
+    """
+    asyncio replay server: any number of consumers can attach to the same newline-delimited CSV stream
+
+    Every subscriber gets its own bounded buffer and writer task, lines are published once and fanned out.
+
+    'framings' maps the binary framings offered to an encoder of a list of lines into one frame (bytes). A
+    consumer asks for one by sending 'FRAMING <name>\n' within 'negotiation_timeout' seconds of connecting;
+    the answer is the same line, or 'FRAMING csv\n' when that framing is not offered. Consumers that send
+    nothing get CSV lines. Every published batch is encoded once per framing in use.
+    e.g.:
+        server = ReplayServer('localhost', 5900, framings={'arrow': encode_frame})
+        await server.start()
+        await server.wait_for_subscribers()
+        await server.publish(['1,PAYMENT,...', ...])
+    """
+
+    def __init__(self, host='localhost', port=5900, buffer_size=10000, policy=DROP_OLDEST, max_batch=1024,
+                 framings=None, negotiation_timeout=0.5):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError("Unknown backpressure policy: {}".format(policy))
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.max_batch = max_batch
+        self.framings = dict(framings or {})
+        self.negotiation_timeout = negotiation_timeout
+        self.subscribers = set()
+        # totals of the subscribers that already left
+        self.retired = {"written": 0, "dropped": 0, "writes": 0, "write_seconds": 0.0, "max_write_seconds": 0.0}
+        self.server = None
+        self._subscribed = None
+
+    async def start(self):
+        self._subscribed = asyncio.Condition()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, reuse_address=True)
+        print("Listening on port: %s" % str(self.port))
+        return self
+
+    async def _negotiate(self, reader, subscriber):
+        """Framing asked for by the consumer, if any: without binary framings there is nothing to wait for"""
+        if not self.framings:
+            return
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.negotiation_timeout)
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            return
+        if not line.startswith(HELLO):
+            return
+        framing = line[len(HELLO):].strip().decode('ascii', 'replace')
+        if framing in self.framings:
+            subscriber.framing = framing
+        subscriber.writer.write(HELLO + (subscriber.framing or 'csv').encode('ascii') + b'\n')
+
+    async def _handle(self, reader, writer):
+        subscriber = Subscriber(writer, self.buffer_size, self.policy)
+        await self._negotiate(reader, subscriber)
+        print("Subscriber connected: %s (%s)" % (str(subscriber.peer), subscriber.framing or 'csv'))
+        async with self._subscribed:
+            self.subscribers.add(subscriber)
+            self._subscribed.notify_all()
+        try:
+            await subscriber.run(self.max_batch)
+        finally:
+            self.subscribers.discard(subscriber)
+            self.retired = self._totals([subscriber], self.retired)
+            print("Subscriber disconnected: %s (sent: %d, dropped: %d)" %
+                  (str(subscriber.peer), subscriber.sent, subscriber.dropped))
+
+    @staticmethod
+    def _totals(subscribers, totals):
+        totals = dict(totals)
+        for subscriber in subscribers:
+            totals["written"] += subscriber.sent
+            totals["dropped"] += subscriber.dropped
+            totals["writes"] += subscriber.writes
+            totals["write_seconds"] += subscriber.write_seconds
+            totals["max_write_seconds"] = max(totals["max_write_seconds"], subscriber.max_write_seconds)
+        return totals
+
+    def stats(self):
+        """Lines written to and dropped for all subscribers so far, and the time spent in socket writes"""
+        totals = self._totals(list(self.subscribers), self.retired)
+        totals["subscribers"] = len(self.subscribers)
+        totals["write_seconds"] = round(totals["write_seconds"], 6)
+        totals["max_write_seconds"] = round(totals["max_write_seconds"], 6)
+        return totals
+
+    async def wait_for_subscribers(self, n=1):
+        async with self._subscribed:
+            await self._subscribed.wait_for(lambda: len(self.subscribers) >= n)
+
+    async def publish(self, lines):
+        """Fan out a batch of lines (str, or newline terminated bytes-like) to every subscriber"""
+        subscribers = list(self.subscribers)
+        if not lines or not subscribers:
+            return
+        puts, frames = [], {}
+        for subscriber in subscribers:
+            if subscriber.framing:
+                if subscriber.framing not in frames:
+                    frames[subscriber.framing] = self.framings[subscriber.framing](lines)
+                puts.append(subscriber.put_frame(frames[subscriber.framing], len(lines)))
+        if len(puts) < len(subscribers):
+            encoded = [line if isinstance(line, (bytes, memoryview)) else '{}\n'.format(line).encode('utf-8')
+                       for line in lines]
+            puts.extend(subscriber.put(encoded) for subscriber in subscribers if not subscriber.framing)
+        await asyncio.gather(*puts)
+
+    async def close(self, timeout=5):
+        if self.server is not None:
+            self.server.close()
+        subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+        tasks = [subscriber.task for subscriber in subscribers if subscriber.task is not None]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        if self.server is not None:
+            await self.server.wait_closed()
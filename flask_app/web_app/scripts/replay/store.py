@@ -0,0 +1,96 @@
+import mmap
+import struct
+
+import numpy as np
+
+MAGIC = b'JOURNEYS'
+VERSION = 1
+
+# magic, version, number of journeys, total number of lines
+header = struct.Struct('<8sIIQ')
+index_dtype = np.dtype([('id', '<i8'), ('first', '<u8'), ('count', '<u8')])
+
+
+def compile_journeys(journeys, path):
+    """
+    One-time compile of journeys ({id: iterable of CSV lines}) into a single memory-mappable file
+
+    Layout (little endian):
+        header        magic, version, #journeys, #lines
+        index         #journeys x (id, first line, line count)
+        offsets       #lines + 1 x uint64, byte offset of every line in 'lines'
+        steps         #lines x float64, the 'step' column, for timestamp pacing without parsing
+        lines         newline terminated, UTF-8 encoded CSV lines, journey after journey
+    """
+    index, offsets, steps, blobs = [], [0], [], []
+    for id, lines in journeys.items():
+        encoded = ['{}\n'.format(line).encode('utf-8') for line in lines]
+        index.append((id, len(steps), len(encoded)))
+        for line in encoded:
+            offsets.append(offsets[-1] + len(line))
+            steps.append(float(line[:line.index(b',')]))
+        blobs.extend(encoded)
+
+    with open(path, 'wb') as f:
+        f.write(header.pack(MAGIC, VERSION, len(index), len(steps)))
+        f.write(np.array(index, dtype=index_dtype).tobytes())
+        f.write(np.array(offsets, dtype='<u8').tobytes())
+        f.write(np.array(steps, dtype='<f8').tobytes())
+        for blob in blobs:
+            f.write(blob)
+
+
+class JourneyStore:
+    """
+    Read side of 'compile_journeys': the file is memory-mapped, nothing is parsed or decoded at startup
+
+    Lines are handed out as memoryview slices of the mapping (zero-copy) ready to be written to a socket.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mmap)
+
+        magic, version, journeys, lines = header.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a journey store (version {}): {}".format(VERSION, path))
+
+        position = header.size
+        self.index = np.frombuffer(self.buffer, index_dtype, journeys, position)
+        position += self.index.nbytes
+        self.offsets = np.frombuffer(self.buffer, '<u8', lines + 1, position)
+        position += self.offsets.nbytes
+        self.steps = np.frombuffer(self.buffer, '<f8', lines, position)
+        self.data = position + self.steps.nbytes
+
+        self.journeys = {int(id): (int(first), int(count)) for id, first, count in self.index}
+
+    def __contains__(self, id):
+        return id in self.journeys
+
+    def __len__(self):
+        return len(self.journeys)
+
+    def lines(self, id):
+        """Lines of a journey, as memoryview slices"""
+        first, count = self.journeys[id]
+        offsets = self.offsets[first:first + count + 1].tolist()
+        return (self.buffer[self.data + start:self.data + end] for start, end in zip(offsets, offsets[1:]))
+
+    def timestamped_lines(self, id):
+        """(step, line) pairs of a journey"""
+        first, count = self.journeys[id]
+        return zip(self.steps[first:first + count].tolist(), self.lines(id))
+
+    def close(self):
+        self.index = self.offsets = self.steps = None
+        try:
+            self.buffer.release()
+            self.mmap.close()
+        except BufferError:
+            # lines handed out are still referenced (e.g. queued by the server): the mapping is unmapped once
+            # the last of them is freed
+            pass
+        self.buffer = self.mmap = None
+        self.file.close()
@@ -1,68 +1,143 @@
+import argparse
+import asyncio
+import heapq
+import json
+import os
 import sys
-import time
-import socket
-import glob
-import re
+from itertools import cycle, islice
 
-from pandas import read_csv
+from replay import ReplayServer, RateScheduler, TimestampScheduler, JourneyStore, JourneyCatalog
 
 
-class Netcat:
-    """ Python 'netcat like' module """
-
-    def __init__(self, ip, port):
-        s = socket.socket()
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-        host = ip
-        port = port
-
-        s.bind((host, port))
-
-        print("Listening on port: %s" % str(port))
-
-        s.listen(5)
-
-        self.socket, addr = s.accept()
-
-    def write(self, data):
-        self.socket.send(data.encode('utf-8'))
-
-    def close(self):
-        self.socket.close()
-
-
-def read_all(pattern):
-    def extract_int_from_file(file):
-        match = re.search(r"_(?P<int>\d+)\.csv", file)
-        if match:
-            return int(match.group("int"))
-
-    files = glob.glob(pattern)
-    return sorted(files, key=extract_int_from_file)
-
-
-frequency = float(sys.argv[1])
-journey_ids = [int(x) for x in sys.argv[2:]]
-
-transactions = read_all('/Users/joaoneves/Documents/demo-iot-transactions/data/transactions/*.csv')
-serialize_rd = lambda x: (','.join((str(i) for i in row)) for row in x.values.tolist())
-transaction_journey = {i: serialize_rd(read_csv(file)) for i, file in enumerate(transactions) if i in journey_ids}
-
-# print(transaction_journey)
-
-nc = Netcat(ip='localhost', port=5900)
-
-# print(journey_ids)
-
-while True:
-    for id in journey_ids:
+def roundrobin(*iterables):
+    """roundrobin('ABC', 'D', 'EF') --> A D E B F C (itertools recipe)"""
+    num_active = len(iterables)
+    nexts = cycle(iter(it).__next__ for it in iterables)
+    while num_active:
         try:
-            line = next(transaction_journey[id])
-            # print(line)
-            nc.write('{}\n'.format(line))
-        except Exception as e:
-            print(e)
-    time.sleep(frequency)
-
-nc.close()
+            for next in nexts:
+                yield next()
+        except StopIteration:
+            num_active -= 1
+            nexts = cycle(islice(nexts, num_active))
+
+
+def step_of(line):
+    return float(line[:line.index(',')])
+
+
+parser = argparse.ArgumentParser(description="Replay transaction journeys on a socket")
+parser.add_argument('frequency', type=float, help="seconds between two rounds (one transaction per journey)")
+parser.add_argument('journey_ids', type=int, nargs='+')
+parser.add_argument('--rate', type=float, help="target events/sec, overrides 'frequency'")
+parser.add_argument('--speed', type=float, help="replay at a multiple of the original 'step' timestamps")
+parser.add_argument('--port', type=int, default=5900)
+parser.add_argument('--shards', type=int, default=1,
+                    help="journeys are split over this many servers, on ports 'port' to 'port + shards - 1'")
+parser.add_argument('--data',
+                    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data/transactions'),
+                    help="directory of the 'transactions_<id>.csv' journey files")
+parser.add_argument('--report-interval', type=float, default=10.0, help="seconds between two progress reports")
+parser.add_argument('--store', help="journey store built by 'compile_journeys.py', replaces reading the CSVs")
+parser.add_argument('--subscribers', type=int, default=1,
+                    help="consumers to wait for before replaying (the Structured Streaming app opens 2 per source)")
+parser.add_argument('--binary', action='store_true',
+                    help="also offer the Arrow framing (pipeline/framing.py) to the consumers asking for it")
+args = parser.parse_args()
+
+frequency = args.frequency
+journey_ids = args.journey_ids
+
+if args.store:
+    store = JourneyStore(args.store)
+    journey_ids = [id for id in journey_ids if id in store]
+    journey_lines = store.lines
+    journey_timestamped_lines = store.timestamped_lines
+    journey_rows = lambda id: store.journeys[id][1]
+else:
+    # only the requested journeys are opened, lazily, and each one is closed once exhausted
+    catalog = JourneyCatalog(args.data)
+    journey_ids = [id for id in journey_ids if id in catalog]
+    journey_lines = catalog.lines
+    journey_timestamped_lines = lambda id: ((step_of(line), line) for line in catalog.lines(id))
+    journey_rows = lambda id: catalog[id].rows
+
+missing = set(args.journey_ids) - set(journey_ids)
+if missing:
+    print("Unknown journeys: {}".format(sorted(missing)))
+print("Replaying {} journeys ({} transactions)".format(len(journey_ids), sum(map(journey_rows, journey_ids))))
+
+
+def report(server, scheduler, event="report"):
+    # one JSON object per line, parsed by the stream supervisor for its status endpoint
+    print("Replay {} on port {}: {}".format(event, server.port, json.dumps(dict(scheduler.report(), **server.stats()))))
+
+
+async def replay_at_rate(server, rate, journey_ids):
+    scheduler = RateScheduler(rate, report_interval=args.report_interval)
+    lines = roundrobin(*(journey_lines(id) for id in journey_ids))
+    while True:
+        batch = list(islice(lines, await scheduler.acquire()))
+        if not batch:
+            return scheduler
+        await server.publish(batch)
+        scheduler.record(len(batch))
+        if scheduler.should_report():
+            report(server, scheduler)
+
+
+async def replay_at_speed(server, speed, journey_ids):
+    scheduler = TimestampScheduler(speed, report_interval=args.report_interval)
+    lines = heapq.merge(*(journey_timestamped_lines(id) for id in journey_ids), key=lambda pair: pair[0])
+    batch, step = [], None
+    for line_step, line in lines:
+        if batch and line_step != step:
+            await scheduler.wait_until(step)
+            await server.publish(batch)
+            scheduler.record(len(batch))
+            batch = []
+            if scheduler.should_report():
+                report(server, scheduler)
+        batch.append(line)
+        step = line_step
+    if batch:
+        await scheduler.wait_until(step)
+        await server.publish(batch)
+        scheduler.record(len(batch))
+    return scheduler
+
+
+def framings():
+    """Binary framings offered on top of CSV, the encoder comes from the pipeline package at the repository root"""
+    if not args.binary:
+        return None
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..'))
+    from pipeline.framing import ARROW, encode_frame
+
+    return {ARROW: encode_frame}
+
+
+async def replay(port, journey_ids, rate):
+    server = await ReplayServer(host='localhost', port=port, framings=framings()).start()
+
+    # nothing is sent before the expected consumers (the Spark receivers) attach, others may join at any time
+    await server.wait_for_subscribers(args.subscribers)
+
+    if args.speed:
+        scheduler = await replay_at_speed(server, args.speed, journey_ids)
+    else:
+        scheduler = await replay_at_rate(server, rate, journey_ids)
+    report(server, scheduler, "finished")
+
+    await server.close()
+
+
+async def replay_shards():
+    """One server per shard (one Spark receiver each), journeys dealt round-robin, the rate split evenly"""
+    shards = [journey_ids[i::args.shards] for i in range(args.shards)]
+    rate = args.rate or len(journey_ids) / frequency
+    await asyncio.gather(*(replay(args.port + i, shard, rate * len(shard) / len(journey_ids))
+                           for i, shard in enumerate(shards) if shard))
+
+
+asyncio.run(replay_shards())
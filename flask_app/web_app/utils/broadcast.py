@@ -0,0 +1,54 @@
+import json
+import threading
+from collections import deque
+from itertools import islice
+
+
+class Broadcaster:
+    """
+    Single fan-out buffer shared by every Server-Sent Events client
+
+    Each published event is serialized once, appended to a bounded ring buffer and all waiting clients are
+    woken up; a client only keeps the id of the last event it sent. Clients that fall further behind than
+    the buffer skip the events that were overwritten.
+    """
+
+    def __init__(self, size=1024):
+        self.events = deque(maxlen=size)
+        self.last_id = 0
+        self.clients = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event, data):
+        with self.condition:
+            self.last_id += 1
+            self.events.append('id: {}\nevent: {}\ndata: {}\n\n'.format(
+                self.last_id, event, json.dumps(data, separators=(',', ':'))).encode('utf-8'))
+            self.condition.notify_all()
+        return self.last_id
+
+    def since(self, last_id, timeout=None):
+        """Events published after 'last_id', waiting up to 'timeout' seconds for one"""
+        with self.condition:
+            if self.last_id <= last_id:
+                self.condition.wait(timeout)
+            first_id = self.last_id - len(self.events) + 1
+            return self.last_id, list(islice(self.events, max(0, last_id + 1 - first_id), None))
+
+    def subscribe(self, last_id=None, heartbeat=15):
+        """
+        SSE byte stream for one client, starting after 'last_id' (e.g. the 'Last-Event-ID' header) or with
+        the next event. A comment is sent every 'heartbeat' seconds of silence to detect gone clients.
+        """
+        with self.condition:
+            self.clients += 1
+            if last_id is None:
+                last_id = self.last_id
+        try:
+            yield b'retry: 2000\n\n'
+            while True:
+                last_id, events = self.since(last_id, heartbeat)
+                yield b''.join(events) if events else b': heartbeat\n\n'
+        finally:
+            with self.condition:
+                self.clients -= 1
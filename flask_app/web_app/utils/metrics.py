@@ -0,0 +1,134 @@
+import numbers
+import threading
+import time
+
+types = ('counter', 'gauge', 'histogram', 'summary')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', r'\\').replace('"', r'\"'))
+                          for k, v in sorted(labels.items())) + '}'
+
+
+def _value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(families):
+    """
+    Prometheus text exposition of metric families: {name: {'type', 'help', 'samples': [[labels, value], ...]}}
+
+    Histogram values are {'buckets': [[le, cumulative count], ...], 'sum', 'count'}, summary values
+    {'sum', 'count'}.
+    """
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append('# HELP {} {}'.format(name, family['help']))
+        lines.append('# TYPE {} {}'.format(name, family['type']))
+        for labels, value in family['samples']:
+            if family['type'] == 'histogram':
+                for le, count in value['buckets']:
+                    lines.append('{}_bucket{} {}'.format(name, _labels(dict(labels, le=le)), count))
+                lines.append('{}_bucket{} {}'.format(name, _labels(dict(labels, le='+Inf')), value['count']))
+            if family['type'] in ('histogram', 'summary'):
+                lines.append('{}_sum{} {}'.format(name, _labels(labels), _value(value['sum'])))
+                lines.append('{}_count{} {}'.format(name, _labels(labels), value['count']))
+            else:
+                lines.append('{}{} {}'.format(name, _labels(labels), _value(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _valid_value(kind, value):
+    if kind in ('counter', 'gauge'):
+        return _number(value)
+    if not isinstance(value, dict) or not _number(value.get('sum')) or not _number(value.get('count')):
+        return False
+    return kind == 'summary' or (isinstance(value.get('buckets'), list) and
+                                 all(isinstance(bucket, list) and len(bucket) == 2 and all(map(_number, bucket))
+                                     for bucket in value['buckets']))
+
+
+def valid_family(family):
+    """A family as 'render' expects it: a known type, a str help and [labels, value] samples of that type"""
+    if not isinstance(family, dict) or family.get('type') not in types or not isinstance(family.get('help'), str) \
+            or not isinstance(family.get('samples'), list):
+        return False
+    return all(isinstance(sample, list) and len(sample) == 2 and isinstance(sample[0], dict) and
+               all(isinstance(key, str) for key in sample[0]) and _valid_value(family['type'], sample[1])
+               for sample in family['samples'])
+
+
+def merge(*sources):
+    """Families of several sources in one, each sample labelled with the session it comes from, bad ones skipped"""
+    merged = {}
+    for session, families in sources:
+        for name, family in families.items():
+            if not isinstance(name, str) or not valid_family(family):
+                continue
+            target = merged.get(name)
+            if target is not None and target['type'] != family['type']:
+                continue
+            target = merged.setdefault(name, {"type": family['type'], "help": family['help'], "samples": []})
+            target['samples'].extend([dict(labels, session=session), value] for labels, value in family['samples'])
+    return merged
+
+
+class MetricsStore:
+    """
+    Last metrics snapshot pushed by each streaming application, by session name
+
+    Snapshots older than 'expire' seconds (an application that stopped pushing) are no longer exported.
+    """
+
+    def __init__(self, expire=300):
+        self.expire = expire
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    def push(self, session, families):
+        with self.lock:
+            self.snapshots[session] = (time.time(), families)
+
+    def sources(self):
+        now = time.time()
+        with self.lock:
+            self.snapshots = {session: (pushed, families) for session, (pushed, families) in self.snapshots.items()
+                              if now - pushed < self.expire}
+            return [(session, families) for session, (_, families) in self.snapshots.items()]
+
+
+def source_families(status):
+    """Metric families of one replay source, from its supervised session status"""
+    report = status['source']
+
+    def gauge(help, value):
+        return {"type": "gauge", "help": help, "samples": [[{}, value]]}
+
+    def counter(help, value):
+        return {"type": "counter", "help": help, "samples": [[{}, value]]}
+
+    return {
+        'replay_lines_sent_total': counter("Lines published by the replay source", report.get('sent', 0)),
+        'replay_lines_per_second': gauge("Achieved replay rate", report.get('achieved_rate', 0.0)),
+        'replay_schedule_lag_seconds': gauge("How far the replay is behind its schedule", report.get('late', 0.0)),
+        'replay_lines_skipped_total': counter("Lines the rate schedule skipped to bound its catch-up burst",
+                                              report.get('skipped', 0)),
+        'replay_lines_written_total': counter("Lines written to the subscriber sockets", report.get('written', 0)),
+        'replay_lines_dropped_total': counter("Lines dropped for subscribers that fell behind",
+                                              report.get('dropped', 0)),
+        'replay_subscribers': gauge("Connected consumers", report.get('subscribers', 0)),
+        'replay_socket_write_seconds': {"type": "summary", "help": "Socket writes (one per buffered batch) and "
+                                                                   "their total duration",
+                                        "samples": [[{}, {"sum": report.get('write_seconds', 0.0),
+                                                          "count": report.get('writes', 0)}]]},
+        'replay_socket_write_max_seconds': gauge("Slowest socket write", report.get('max_write_seconds', 0.0)),
+        'pipeline_backlog_lines': gauge("Lines sent by the source and not scored by Spark yet",
+                                        status['lag']['backlog']),
+    }
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+
+listening = re.compile(r'Listening on port: (\d+)')
+replay_report = re.compile(r'Replay (?:report|finished) on port \d+: (\{.*\})')
+
+
+class Process:
+    """
+    A child process in its own process group (session), its stdout consumed line by line on a daemon thread
+
+    Every line is echoed with the process name as prefix and handed to 'on_line'. Python children run
+    unbuffered, otherwise their output would only reach the pipe in 8KB blocks.
+    """
+
+    def __init__(self, name, cmd, on_line, cwd=None):
+        self.name = name
+        self.cmd = cmd
+        self.popen = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, cwd=cwd,
+                                      env=dict(os.environ, PYTHONUNBUFFERED='1'), universal_newlines=True,
+                                      bufsize=1, start_new_session=True)
+        self._reader = threading.Thread(target=self._read, args=(on_line,), name=name, daemon=True)
+        self._reader.start()
+
+    def _read(self, on_line):
+        for line in self.popen.stdout:
+            line = line.rstrip('\n')
+            print("[{}] {}".format(self.name, line))
+            on_line(line)
+
+    @property
+    def pid(self):
+        return self.popen.pid
+
+    @property
+    def returncode(self):
+        return self.popen.poll()
+
+    def alive(self):
+        return self.popen.poll() is None
+
+    def terminate(self, timeout=10.0):
+        """SIGTERM to the whole group (spark-submit forks the JVM and the Python workers), SIGKILL after 'timeout'"""
+        for sig, wait in ((signal.SIGTERM, timeout), (signal.SIGKILL, None)):
+            try:
+                os.killpg(self.popen.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                self.popen.wait(wait)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+        self._reader.join(1.0)
+        return self.popen.poll()
+
+
+class Session:
+    """
+    One replay source and the Spark Streaming application reading from it
+
+    The source is launched first; Spark is only submitted once the source reports that its port is listening,
+    so the receiver never starts against a closed port. Launching happens on a background thread and the
+    session moves through 'starting' -> 'running' -> 'stopped' | 'failed'.
+    """
+
+    def __init__(self, name, port, source_cmd, spark_cmd, cwd=None, ready_timeout=60.0):
+        self.name = name
+        self.port = port
+        self.source_cmd = source_cmd
+        self.spark_cmd = spark_cmd
+        self.cwd = cwd
+        self.ready_timeout = ready_timeout
+        self.state = 'starting'
+        self.error = None
+        self.started = time.time()
+        self.source = None
+        self.spark = None
+        self.source_report = {}
+        self.scored = 0
+        self.last_batch = None
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._launcher = threading.Thread(target=self._launch, name='session-' + name, daemon=True)
+
+    def start(self):
+        self._launcher.start()
+        return self
+
+    def _on_source_line(self, line):
+        match = listening.search(line)
+        if match and int(match.group(1)) == self.port:
+            self._ready.set()
+            return
+        match = replay_report.search(line)
+        if match:
+            self.source_report = json.loads(match.group(1))
+
+    def on_metrics(self, families):
+        """Throughput from the metrics snapshot the Spark application pushes (see 'pipeline.metrics')"""
+
+        def total(name):
+            return sum(value for _, value in families.get(name, {}).get('samples', []))
+
+        self.scored = total('pipeline_parsed_rows_total')
+        self.last_batch = {"batches": total('pipeline_batches_total'),
+                           "rows_per_second": total('pipeline_rows_per_second'), "at": time.time()}
+
+    def _launch(self):
+        try:
+            self.source = Process('{}/source'.format(self.name), self.source_cmd, self._on_source_line, self.cwd)
+            deadline = time.monotonic() + self.ready_timeout
+            while not self._ready.wait(0.1):
+                if not self.source.alive():
+                    raise RuntimeError("source exited with code {} before listening".format(self.source.returncode))
+                if self._stopping.is_set():
+                    return
+                if time.monotonic() > deadline:
+                    raise RuntimeError("source not listening on port {} after {}s".format(self.port,
+                                                                                          self.ready_timeout))
+            if self._stopping.is_set():
+                return
+            self.spark = Process('{}/spark'.format(self.name), self.spark_cmd, lambda line: None, self.cwd)
+            self.state = 'running'
+        except Exception as e:
+            self.state, self.error = 'failed', str(e)
+            print("Session {} failed: {}".format(self.name, e))
+            self._terminate()
+
+    def alive(self):
+        return self.state in ('starting', 'running')
+
+    def _terminate(self, timeout=10.0):
+        # the consumer first, so it does not log the source going away as an error
+        return {process.name: process.terminate(timeout) for process in (self.spark, self.source) if process}
+
+    def stop(self, timeout=10.0):
+        self._stopping.set()
+        self._launcher.join(timeout)
+        codes = self._terminate(timeout)
+        if self.state != 'failed':
+            self.state = 'stopped'
+        return codes
+
+    def refresh(self):
+        """Spark exiting, or the source crashing, fails the session; a source done with its replay is fine"""
+        if self.state != 'running':
+            return
+        source, spark = self.source.alive(), self.spark.alive()
+        if not spark:
+            self.state, self.error = 'failed', "spark exited with code {}".format(self.spark.returncode)
+            self._terminate()
+        elif not source and self.source.returncode != 0:
+            self.state, self.error = 'failed', "source exited with code {}".format(self.source.returncode)
+            self._terminate()
+
+    def status(self):
+        self.refresh()
+        sent = self.source_report.get('sent', 0)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "error": self.error,
+            "port": self.port,
+            "uptime": round(time.time() - self.started, 1),
+            "pids": {process.name: process.pid for process in (self.source, self.spark) if process},
+            "throughput": {"sent": sent, "scored": self.scored,
+                           "source_rate": self.source_report.get('achieved_rate', 0.0),
+                           "last_batch": self.last_batch},
+            # 'schedule' is how far the source is behind its own pacing (s), 'backlog' what Spark has not scored yet
+            "lag": {"schedule": self.source_report.get('late', 0.0), "backlog": max(0, sent - self.scored)},
+            "source": self.source_report,
+        }
+
+
+class Supervisor:
+    """
+    Named streaming sessions, launched without blocking the caller
+
+    e.g.:
+        supervisor = Supervisor()
+        supervisor.start('demo', source_cmd=lambda port: [...], spark_cmd=lambda port: [...])
+        supervisor.status('demo')
+        supervisor.stop('demo')
+    """
+
+    def __init__(self, base_port=5900):
+        self.base_port = base_port
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def _free_port(self):
+        used = {session.port for session in self.sessions.values() if session.alive()}
+        port = self.base_port
+        while port in used:
+            port += 1
+        return port
+
+    def start(self, name, source_cmd, spark_cmd, cwd=None, ready_timeout=60.0):
+        """'source_cmd' and 'spark_cmd' build the command lines from the port allocated to the session"""
+        with self._lock:
+            session = self.sessions.get(name)
+            if session is not None:
+                session.refresh()
+                if session.alive():
+                    raise KeyError("Session already running: {}".format(name))
+            port = self._free_port()
+            session = Session(name, port, source_cmd(port), spark_cmd(port), cwd, ready_timeout)
+            self.sessions[name] = session
+        return session.start()
+
+    def stop(self, name, timeout=10.0):
+        """The exit codes of the session's processes, None for an unknown session"""
+        with self._lock:
+            session = self.sessions.pop(name, None)
+        if session is None:
+            return None
+        return session.stop(timeout)
+
+    def observe(self, name, families):
+        """A metrics snapshot pushed by the session's Spark application, False for an unknown session"""
+        with self._lock:
+            session = self.sessions.get(name)
+            if session is None:
+                return False
+            session.on_metrics(families)
+        return True
+
+    def stop_all(self, timeout=10.0):
+        with self._lock:
+            names = list(self.sessions)
+        return {name: self.stop(name, timeout) for name in names}
+
+    def status(self, name=None):
+        """Status of every session by name, or of the 'name' one (None when unknown)"""
+        # looked up under the lock, the status itself may take a while (a failed session's processes are killed)
+        with self._lock:
+            sessions = dict(self.sessions) if name is None else {name: self.sessions.get(name)}
+        if name is not None:
+            return sessions[name].status() if sessions[name] is not None else None
+        return {name: session.status() for name, session in sessions.items()}
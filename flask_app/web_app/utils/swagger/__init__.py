@@ -3,7 +3,7 @@ template = {
     "uiversion": "3",
     "info": {
         "title": "Transactions Monitoring Demo",
-        "description": "API documentation.\n\nStreaming resources at:\n\n\t/stream/start/transactions\n\nand \n\n\t/stream/stop/transactions",
+        "description": "API documentation.\n\nStreaming resources at:\n\n\t/stream/start/transactions\n\nand \n\n\t/stream/stop/transactions\n\nLive events (Server-Sent Events) at:\n\n\t/stream/events\n\nSession status at:\n\n\t/stream/status\n\nStage metrics (Prometheus) at:\n\n\t/metrics",
         "contact": {
             "responsibleOrganization": "Marionete",
             "responsibleDeveloper": "João Neves",
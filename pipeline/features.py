@@ -0,0 +1,230 @@
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from pipeline.scoring import feature_columns
+
+# columns of a batch the store reads, and the features it computes for every transaction
+state_columns = ['id', 'entity_id', 'step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'gps_latitude',
+                 'gps_longitude']
+entity_feature_columns = ['entity_transactions', 'hours_since_last', 'amount_mean', 'amount_std', 'amount_zscore',
+                          'distance_km', 'balance_error']
+# inputs of the model trained by 'dataset.train', in training order
+entity_model_columns = feature_columns + entity_feature_columns
+
+earth_radius_km = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * earth_radius_km * np.arcsin(np.sqrt(a))
+
+
+class FeatureStore:
+    """
+    Compact per-entity state in preallocated NumPy columns (struct of arrays), an entity -> slot dict on top
+
+    Per entity: transactions seen, step and GPS fix of the last one, exponentially weighted mean and variance
+    of the amount ('alpha') and the wall-clock time it was last seen. Entities idle for more than 'ttl' seconds
+    are evicted and their slots reused; the columns double when full.
+
+    'update' computes the features of a batch against the history *before* folding the batch in. An entity
+    with several transactions in the batch is handled in rounds, its k-th transaction (by step) in round k,
+    every round being vectorized over the entities.
+    e.g.:
+        store = FeatureStore(ttl=24 * 3600, checkpoint='features.npz')
+        features = store.update(batch)  # pandas DataFrame: 'id' + entity_feature_columns
+    """
+
+    fields = {'count': np.int32, 'last_step': np.float32, 'last_lat': np.float32, 'last_lon': np.float32,
+              'mean': np.float32, 'var': np.float32, 'seen': np.float64}
+
+    def __init__(self, capacity=1 << 16, ttl=24 * 3600.0, alpha=0.1, checkpoint=None, checkpoint_every=12,
+                 evict_every=60.0, clock=time.time):
+        self.ttl = ttl
+        self.alpha = alpha
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.evict_every = evict_every
+        self.clock = clock
+        self.slots = {}
+        self.free = []
+        self.size = 0
+        self.batches = 0
+        self.evicted = 0
+        self._evicted_at = clock()
+        self.columns = {name: np.zeros(capacity, dtype) for name, dtype in self.fields.items()}
+        self.keys = np.empty(capacity, dtype=object)
+        if checkpoint and os.path.isfile(checkpoint):
+            self.load()
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def capacity(self):
+        return len(self.keys)
+
+    def _grow(self, capacity):
+        for name, column in self.columns.items():
+            self.columns[name] = np.concatenate([column, np.zeros(capacity - len(column), column.dtype)])
+        self.keys = np.concatenate([self.keys, np.empty(capacity - len(self.keys), dtype=object)])
+
+    def _slots(self, entities):
+        """Slot of every (distinct) entity, new entities getting a free or a fresh slot with an empty state"""
+        slots = np.empty(len(entities), dtype=np.int64)
+        new = []
+        for i, entity in enumerate(entities):
+            slot = self.slots.get(entity)
+            if slot is None:
+                if self.free:
+                    slot = self.free.pop()
+                else:
+                    slot = self.size
+                    self.size += 1
+                    if slot >= self.capacity:
+                        self._grow(2 * self.capacity)
+                self.slots[entity] = slot
+                self.keys[slot] = entity
+                new.append(slot)
+            slots[i] = slot
+        if new:
+            self.columns['count'][new] = 0
+        return slots
+
+    def update(self, batch):
+        """Features of every transaction of 'batch' (a pandas DataFrame with the 'state_columns'), state updated"""
+        now = self.clock()
+        n = len(batch)
+        codes, entities = pd.factorize(batch['entity_id'])
+        slot = self._slots(entities)[codes]
+        step = batch['step'].values.astype(np.float64)
+        amount = batch['amount'].values.astype(np.float64)
+        lat = batch['gps_latitude'].values
+        lon = batch['gps_longitude'].values
+
+        # rows sorted by entity then step, 'occurrence' being the rank of a row within its entity
+        order = np.lexsort((step, codes))
+        first = np.r_[True, codes[order][1:] != codes[order][:-1]]
+        starts = np.flatnonzero(first)
+        occurrence = np.empty(n, dtype=np.int64)
+        occurrence[order] = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+
+        features = {name: np.full(n, np.nan) for name in entity_feature_columns}
+        c = self.columns
+        for k in range(int(occurrence.max()) + 1 if n else 0):
+            rows = np.flatnonzero(occurrence == k)
+            s = slot[rows]
+            seen = c['count'][s] > 0
+            mean, var = c['mean'][s].astype(np.float64), c['var'][s].astype(np.float64)
+            std = np.sqrt(var)
+            deviation = amount[rows] - mean
+
+            features['entity_transactions'][rows] = c['count'][s] + 1
+            features['hours_since_last'][rows] = np.where(seen, step[rows] - c['last_step'][s], np.nan)
+            features['amount_mean'][rows] = np.where(seen, mean, np.nan)
+            features['amount_std'][rows] = np.where(seen, std, np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features['amount_zscore'][rows] = np.where(seen & (std > 0), deviation / std, np.nan)
+            features['distance_km'][rows] = np.where(seen, haversine_km(c['last_lat'][s], c['last_lon'][s],
+                                                                        lat[rows], lon[rows]), np.nan)
+
+            c['mean'][s] = np.where(seen, mean + self.alpha * deviation, amount[rows])
+            c['var'][s] = np.where(seen, (1 - self.alpha) * (var + self.alpha * deviation ** 2), 0.0)
+            c['count'][s] += 1
+            c['last_step'][s] = step[rows]
+            c['last_lat'][s] = lat[rows]
+            c['last_lon'][s] = lon[rows]
+            c['seen'][s] = now
+
+        # PaySim balances move by exactly 'amount' (either way) unless something is off
+        features['balance_error'] = np.abs(np.abs(batch['newbalanceOrig'].values - batch['oldbalanceOrg'].values)
+                                           - amount)
+
+        self.batches += 1
+        if now - self._evicted_at >= self.evict_every:
+            self.evict(now)
+        if self.checkpoint and self.batches % self.checkpoint_every == 0:
+            self.save()
+
+        features = pd.DataFrame(features, index=batch.index)
+        features.insert(0, 'id', batch['id'].values)
+        return features
+
+    def evict(self, now=None):
+        """Forget the entities idle for more than 'ttl' seconds, returns how many"""
+        now = self.clock() if now is None else now
+        self._evicted_at = now
+        used = np.arange(self.size)
+        expired = used[(self.columns['count'][:self.size] > 0) & (now - self.columns['seen'][:self.size] > self.ttl)]
+        for slot in expired:
+            del self.slots[self.keys[slot]]
+            self.keys[slot] = None
+        self.columns['count'][expired] = 0
+        self.free.extend(expired.tolist())
+        self.evicted += len(expired)
+        return len(expired)
+
+    def nbytes(self):
+        """Memory of the state columns, the dict and the entity ids (CPython sizes)"""
+        import sys
+
+        columns = sum(column.nbytes for column in self.columns.values()) + self.keys.nbytes
+        index = sys.getsizeof(self.slots) + sum(sys.getsizeof(key) for key in self.slots)
+        return {"columns": columns, "index": index, "entities": len(self),
+                "per_entity": (columns + index) / len(self) if len(self) else 0.0}
+
+    def save(self):
+        """Atomic checkpoint of the state (uncompressed .npz)"""
+        used = self.columns['count'][:self.size] > 0
+        arrays = {name: column[:self.size][used] for name, column in self.columns.items()}
+        arrays['keys'] = self.keys[:self.size][used].astype(str)
+        with open(self.checkpoint + '.tmp', 'wb') as f:
+            np.savez(f, ttl=self.ttl, alpha=self.alpha, **arrays)
+        os.replace(self.checkpoint + '.tmp', self.checkpoint)
+
+    def load(self):
+        with np.load(self.checkpoint) as state:
+            if float(state['ttl']) != self.ttl or float(state['alpha']) != self.alpha:
+                return
+            keys = state['keys'].astype(object)
+            if len(keys) > self.capacity:
+                self._grow(int(2 ** np.ceil(np.log2(len(keys)))))
+            for name in self.columns:
+                self.columns[name][:len(keys)] = state[name]
+        self.keys[:len(keys)] = keys
+        self.slots = {key: slot for slot, key in enumerate(keys)}
+        self.size = len(keys)
+
+
+@lru_cache(maxsize=None)
+def features_schema():
+    from pyspark.sql.types import StructType, StructField, DoubleType, StringType
+
+    return StructType([StructField('id', StringType(), True)] +
+                      [StructField(column, DoubleType(), True) for column in entity_feature_columns])
+
+
+def batch_features(df, store):
+    """
+    The entity features of a parsed batch (pandas), the store updated with it
+
+    Only the 'state_columns' are collected to the driver; 'df' should be cached when it is used again.
+    """
+    return store.update(df.select(*state_columns).toPandas())
+
+
+def enrich(spark, df, features):
+    """
+    'batch_features' joined onto their batch by 'id', sent back as a broadcast DataFrame
+
+    The features an entity does not have yet (first sighting) are 0, as the model was trained with them.
+    """
+    from pyspark.sql import functions as F
+
+    features = F.broadcast(spark.createDataFrame(features, schema=features_schema()))
+    return df.join(features, on='id', how='left').fillna(0.0, subset=entity_feature_columns)
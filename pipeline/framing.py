@@ -0,0 +1,188 @@
+import socket
+import struct
+
+from pipeline.schema import columns, encoded_columns, float_columns
+
+# Length-prefixed binary framing of transaction batches on the replay socket, negotiated per connection:
+# a consumer that wants frames sends 'FRAMING arrow\n' right after connecting, the server answers with the same
+# line and from then on writes frames instead of CSV lines. A server without that framing answers
+# 'FRAMING csv\n' and keeps sending lines; consumers that send nothing (e.g. Spark's socket sources) get CSV.
+#
+# Frame: a little endian uint32 payload length, then the payload, an Arrow IPC stream holding the schema and one
+# record batch of the 16 columns, 'encoded_columns' dictionary encoded. Floats travel as their float64 bits, the
+# receiver parses nothing.
+
+ARROW = 'arrow'
+CSV = 'csv'
+
+length = struct.Struct('<I')
+
+
+def arrow_types():
+    """Arrow type of every column, the layout of 'spark_schema'"""
+    import pyarrow as pa
+
+    return {column: pa.float64() if column in float_columns else pa.string() for column in columns}
+
+
+def hello(framing):
+    return 'FRAMING {}\n'.format(framing).encode('ascii')
+
+
+def _bytes(line):
+    if isinstance(line, str):
+        return '{}\n'.format(line).encode('utf-8')
+    return line
+
+
+def encode_frame(lines):
+    """
+    One frame of CSV lines (str, or newline terminated bytes-like as the replay server has them)
+
+    Arrow's C++ CSV reader parses the batch straight from the bytes (floats correctly rounded, like float()),
+    lines without exactly 16 fields are skipped.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as csv
+
+    table = csv.read_csv(pa.py_buffer(b''.join(map(_bytes, lines))),
+                         read_options=csv.ReadOptions(column_names=columns, use_threads=False),
+                         parse_options=csv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+                         convert_options=csv.ConvertOptions(column_types=arrow_types()))
+    batch = pa.RecordBatch.from_arrays([pc.dictionary_encode(table.column(column)).combine_chunks()
+                                        if column in encoded_columns else table.column(column).combine_chunks()
+                                        for column in columns], names=columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    payload = sink.getvalue()
+    return length.pack(payload.size) + payload.to_pybytes()
+
+
+def decode_frame(payload):
+    """The pyarrow RecordBatch of a frame payload (length prefix excluded), without copying its buffers"""
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(payload).read_next_batch()
+
+
+def spark_batch(batch):
+    """
+    A decoded frame in the exact Arrow layout of 'spark_schema', what a Python data source hands to Spark
+
+    Only the dictionary encoded columns are converted (to plain strings, by Arrow), the other buffers are kept.
+    """
+    import pyarrow as pa
+
+    schema = pa.schema(list(arrow_types().items()))
+    return pa.RecordBatch.from_arrays([batch.column(field.name).cast(field.type) for field in schema], schema=schema)
+
+
+class FrameReader:
+    """
+    Consumer side of the framing: connects, negotiates and yields the batches as they arrive
+
+    e.g.:
+        with FrameReader('localhost', 5900) as reader:
+            for batch in reader:  # pyarrow RecordBatch
+                ...
+    """
+
+    def __init__(self, host, port, framing=ARROW, timeout=None):
+        self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.socket.makefile('rb')
+        self.socket.sendall(hello(framing))
+        answer = self.file.readline()
+        if answer != hello(framing):
+            self.close()
+            raise ValueError("{}:{} does not offer the '{}' framing: {!r}".format(host, port, framing, answer))
+
+    def read(self):
+        """The next frame's batch, None once the server closed the connection"""
+        header = self.file.read(length.size)
+        if len(header) < length.size:
+            return None
+        payload = self.file.read(length.unpack(header)[0])
+        return decode_frame(payload)
+
+    def __iter__(self):
+        return iter(self.read, None)
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay_data_source():
+    """
+    A Spark (4.0+) Python streaming data source over framed replay sockets, registered as 'replay'
+
+    The frames are read on the driver by a background thread; every micro-batch takes the frames received
+    since the previous one, which are kept until Spark commits them so a batch can be re-read on recovery.
+    e.g.:
+        spark.dataSource.register(replay_data_source())
+        spark.readStream.format('replay').option('host', 'localhost').option('port', 5900).load()
+    """
+    import threading
+
+    from pyspark.sql.datasource import DataSource, SimpleDataSourceStreamReader
+
+    from pipeline.schema import spark_schema
+
+    class ReplayStreamReader(SimpleDataSourceStreamReader):
+        def __init__(self, options):
+            self.reader = FrameReader(options.get('host', 'localhost'), int(options.get('port', 5900)))
+            self.lock = threading.Lock()
+            # frame number -> batch, from 'first' on
+            self.frames = {}
+            self.first = self.received = 0
+            threading.Thread(target=self._receive, name='replay-frames', daemon=True).start()
+
+        def _receive(self):
+            for batch in self.reader:
+                with self.lock:
+                    self.frames[self.received] = spark_batch(batch)
+                    self.received += 1
+
+        def initialOffset(self):
+            return {"frame": 0}
+
+        def _batches(self, start, end):
+            # Arrow record batches go to the JVM as they are, no Python tuple per row; a list iterator because
+            # Spark copies it to replay a batch
+            with self.lock:
+                return iter([self.frames[i] for i in range(start, end) if i in self.frames])
+
+        def read(self, start):
+            with self.lock:
+                end = self.received
+            return self._batches(start['frame'], end), {"frame": end}
+
+        def readBetweenOffsets(self, start, end):
+            return self._batches(start['frame'], end['frame'])
+
+        def commit(self, end):
+            with self.lock:
+                for i in range(self.first, end['frame']):
+                    self.frames.pop(i, None)
+                self.first = max(self.first, end['frame'])
+
+    class ReplayDataSource(DataSource):
+        @classmethod
+        def name(cls):
+            return 'replay'
+
+        def schema(self):
+            return spark_schema()
+
+        def simpleStreamReader(self, schema):
+            return ReplayStreamReader(self.options)
+
+    return ReplayDataSource
@@ -0,0 +1,120 @@
+import numpy as np
+
+# cells of 360 / 2^zoom degrees of longitude by 180 / 2^zoom of latitude, in London about 6.1km x 4.9km,
+# 1.5km x 1.2km and 380m x 300m
+zooms = (12, 14, 16)
+
+
+def cell_of(lat, lon, zoom):
+    """Grid cell of every point at 'zoom', vectorized: x * 2^zoom + y as int64"""
+    n = 2 ** zoom
+    x = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * n).astype(np.int64)
+    y = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / 180.0 * n).astype(np.int64)
+    return x * n + y
+
+
+def cell_center(cells, zoom):
+    """(lat, lon) arrays of the center of every cell"""
+    n = 2 ** zoom
+    x, y = np.divmod(np.asarray(cells, dtype=np.int64), n)
+    return (y + 0.5) / n * 180.0 - 90.0, (x + 0.5) / n * 360.0 - 180.0
+
+
+def batch_cells(df, zooms=zooms):
+    """
+    Per-batch partial (count, amount, frauds) by grid cell at every zoom, computed by Spark in a single job
+
+    The same arithmetic as 'cell_of', in the JVM; only one row per active cell is collected to the driver.
+    """
+    from pyspark.sql import functions as F
+
+    def cell(zoom):
+        n = 2 ** zoom
+        x = F.floor((F.col('gps_longitude') + F.lit(180.0)) / F.lit(360.0) * F.lit(float(n))).cast('long')
+        y = F.floor((F.col('gps_latitude') + F.lit(90.0)) / F.lit(180.0) * F.lit(float(n))).cast('long')
+        return x * F.lit(n) + y
+
+    cells = F.explode(F.array(*[F.struct(F.lit(zoom).alias('zoom'), cell(zoom).alias('cell')) for zoom in zooms]))
+    aggregates = df.select(cells.alias('c'), 'amount', 'prediction') \
+        .groupBy('c.zoom', 'c.cell') \
+        .agg(F.count(F.lit(1)).alias('count'), F.sum('amount').alias('amount'), F.sum('prediction').alias('frauds'))
+
+    partials = {zoom: {} for zoom in zooms}
+    for zoom, cell_, count, amount, frauds in aggregates.collect():
+        partials[zoom][cell_] = (count, amount, frauds)
+    return partials
+
+
+def points_cells(lat, lon, amount, fraud, zooms=zooms):
+    """'batch_cells' for arrays of points on the driver (pandas columns, benchmarks)"""
+    partials = {}
+    for zoom in zooms:
+        cells, inverse = np.unique(cell_of(lat, lon, zoom), return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(cells))
+        amounts = np.bincount(inverse, weights=amount, minlength=len(cells))
+        frauds = np.bincount(inverse, weights=fraud, minlength=len(cells))
+        partials[zoom] = {int(cell): (int(count), float(total), float(fraud_count))
+                          for cell, count, total, fraud_count in zip(cells, counts, amounts, frauds)}
+    return partials
+
+
+class GridHeatmap:
+    """
+    Count, amount and frauds by grid cell at a few zoom levels, accumulated across batches
+
+    Only the cells a batch touched are published, so the map payload grows with the active cells and not with
+    the transactions.
+    e.g.:
+        heatmap = GridHeatmap()
+        heatmap.add(batch_cells(transactions))
+        heatmap.changes()  # {'14': {'cells': [...], 'lat': [...], 'lon': [...], 'count': [...], ...}, ...}
+    """
+
+    def __init__(self, zooms=zooms):
+        self.zooms = zooms
+        self.cells = {zoom: {} for zoom in zooms}
+        self.changed = {zoom: set() for zoom in zooms}
+
+    def add(self, partials):
+        """'partials' maps each zoom to {cell: (count, amount, frauds)} of one batch"""
+        for zoom in self.zooms:
+            cells = self.cells[zoom]
+            for cell, (count, amount, frauds) in partials.get(zoom, {}).items():
+                total_count, total_amount, total_frauds = cells.get(cell, (0, 0.0, 0.0))
+                cells[cell] = (total_count + count, total_amount + amount, total_frauds + frauds)
+            self.changed[zoom].update(partials.get(zoom, {}))
+
+    def changes(self):
+        """Totals of the cells changed since the last call, as columns by zoom (JSON friendly), {} if none"""
+        update = {}
+        for zoom in self.zooms:
+            cells = sorted(self.changed[zoom])
+            if not cells:
+                continue
+            self.changed[zoom] = set()
+            totals = np.array([self.cells[zoom][cell] for cell in cells], dtype=np.float64).reshape(-1, 3)
+            lat, lon = cell_center(cells, zoom)
+            update[str(zoom)] = dict(cells=cells, lat=lat.tolist(), lon=lon.tolist(),
+                                     count=totals[:, 0].astype(np.int64).tolist(), amount=totals[:, 1].tolist(),
+                                     fraud_rate=(totals[:, 2] / np.maximum(totals[:, 0], 1)).tolist())
+        return update
+
+    def __len__(self):
+        return sum(len(cells) for cells in self.cells.values())
+
+
+def merge_changes(updates):
+    """Coalesces pending cell updates for a sink that fell behind: the latest totals of a cell win"""
+    merged = {}
+    for update in updates:
+        for zoom, columns in update.items():
+            cells = merged.setdefault(zoom, {})
+            for i, cell in enumerate(columns['cells']):
+                cells[cell] = {name: values[i] for name, values in columns.items()}
+    names = ('cells', 'lat', 'lon', 'count', 'amount', 'fraud_rate')
+    return {zoom: {name: [cells[cell][name] for cell in sorted(cells)] for name in names}
+            for zoom, cells in merged.items()}
+
+
+def changes_size(update):
+    return sum(len(columns['cells']) for columns in update.values())
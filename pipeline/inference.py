@@ -0,0 +1,84 @@
+import glob
+import json
+import os
+
+import numpy as np
+
+from pipeline.scoring import feature_columns, model_path
+
+
+def _dense_vector(vector):
+    """Decode a Spark ML VectorUDT struct (type 0: sparse, 1: dense) into a NumPy array"""
+    if vector['type'] == 1:
+        return np.asarray(vector['values'], dtype=np.float64)
+    dense = np.zeros(vector['size'], dtype=np.float64)
+    dense[vector['indices']] = vector['values']
+    return dense
+
+
+def _dense_matrix(matrix):
+    """Decode a Spark ML MatrixUDT struct (type 0: sparse, 1: dense) into a 2D NumPy array"""
+    rows, cols = matrix['numRows'], matrix['numCols']
+    if matrix['type'] == 1:
+        values = np.asarray(matrix['values'], dtype=np.float64)
+        if matrix['isTransposed']:
+            return values.reshape(rows, cols)
+        return values.reshape(cols, rows).T
+    # compressed sparse column (or row, when transposed) storage
+    outer, inner = (rows, cols) if matrix['isTransposed'] else (cols, rows)
+    dense = np.zeros((outer, inner), dtype=np.float64)
+    pointers = matrix['colPtrs']
+    for i in range(outer):
+        start, end = pointers[i], pointers[i + 1]
+        dense[i, matrix['rowIndices'][start:end]] = matrix['values'][start:end]
+    return dense if matrix['isTransposed'] else dense.T
+
+
+class NumpyLogisticRegressionModel:
+    """
+    Spark free binary logistic regression, numerically equivalent to 'LogisticRegressionModel.transform'
+
+    Spark predicts 1.0 when the margin is above log(t / (1 - t)), the same as probability > threshold,
+    and computes the probability as 1 / (1 + exp(-margin)); both are reproduced here over whole batches.
+    """
+
+    def __init__(self, coefficients, intercept, threshold=0.5):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.threshold = float(threshold)
+
+    @staticmethod
+    def load(path=model_path):
+        """Read coefficients, intercept and threshold straight from a saved 'LogisticRegressionModel'"""
+        import pyarrow.parquet as pq
+
+        with open(sorted(glob.glob(os.path.join(path, 'metadata', 'part-*')))[0]) as metadata_file:
+            metadata = json.loads(metadata_file.readline())
+        params = dict(metadata.get('defaultParamMap', {}), **metadata['paramMap'])
+
+        data = pq.read_table(os.path.join(path, 'data')).to_pylist()[0]
+        if data.get('isMultinomial') or data['numClasses'] != 2:
+            raise ValueError("Only binomial logistic regression models are supported: {}".format(path))
+
+        coefficients = _dense_matrix(data['coefficientMatrix'])[0]
+        intercept = _dense_vector(data['interceptVector'])[0]
+        return NumpyLogisticRegressionModel(coefficients, intercept, params.get('threshold', 0.5))
+
+    def features(self, transactions):
+        """Stack the model features of a DataFrame/dict of columns into a (n, 8) float matrix"""
+        return np.column_stack([np.asarray(transactions[column], dtype=np.float64) for column in feature_columns])
+
+    def margin(self, X):
+        return X @ self.coefficients + self.intercept
+
+    def predict_proba(self, X):
+        with np.errstate(over='ignore'):
+            return 1.0 / (1.0 + np.exp(-self.margin(X)))
+
+    def predict(self, X):
+        return (self.predict_proba(X) > self.threshold).astype(np.float64)
+
+    def transform(self, transactions):
+        """Return the fraud 'probability' and 'prediction' arrays for a batch of parsed transactions"""
+        probability = self.predict_proba(self.features(transactions))
+        return probability, (probability > self.threshold).astype(np.float64)
@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+# seconds, upper bounds of the latency histograms
+buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# every metric the driver exports: name -> (type, help)
+families = {
+    'pipeline_batches_total': ('counter', "Micro-batches processed"),
+    'pipeline_input_lines_total': ('counter', "Lines received from the replay sources"),
+    'pipeline_parsed_rows_total': ('counter', "Transactions parsed and scored"),
+    'pipeline_parse_errors_total': ('counter', "Malformed lines dropped by the parser"),
+    'pipeline_scheduling_delay_seconds': ('gauge', "Wait of the last batch between its batch time and its start"),
+    'pipeline_rows_per_second': ('gauge', "Parsing and scoring throughput of the last batch"),
+    'pipeline_stage_seconds': ('histogram', "Time spent per batch in each stage"),
+    'pipeline_sink_seconds': ('histogram', "Latency of the writes to each sink"),
+    'pipeline_sink_errors_total': ('counter', "Failed writes to each sink"),
+    'pipeline_sink_dropped_total': ('counter', "Updates dropped because a sink fell behind"),
+    'pipeline_sink_pending': ('gauge', "Updates waiting for a sink"),
+    'pipeline_feature_entities': ('gauge', "Entities held by the feature store"),
+    'pipeline_feature_evictions_total': ('counter', "Entities evicted from the feature store after their TTL"),
+}
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        cumulative, total = [], 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return {"buckets": list(zip(buckets, cumulative)), "sum": self.sum, "count": self.count}
+
+
+class Metrics:
+    """
+    Counters, gauges and latency histograms of the pipeline stages, thread safe
+
+    e.g.:
+        metrics.inc('pipeline_parsed_rows_total', n)
+        with metrics.time('pipeline_stage_seconds', stage='score'):
+            ...
+        metrics.snapshot()  # JSON-able, pushed to the web app which serves it on '/metrics'
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _check(self, name, kind):
+        if families[name][0] != kind:
+            raise ValueError("{} is a {}".format(name, families[name][0]))
+
+    def inc(self, name, value=1, **labels):
+        self._check(name, 'counter')
+        key = (name, _key(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Gauges, or counters whose running total is kept elsewhere (e.g. the BackgroundWriter stats)"""
+        key = (name, _key(labels))
+        with self.lock:
+            self.values[key] = value
+
+    def observe(self, name, value, **labels):
+        self._check(name, 'histogram')
+        key = (name, _key(labels))
+        with self.lock:
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """{name: {'type', 'help', 'samples': [[labels, value], ...]}}, histogram values being dicts"""
+        with self.lock:
+            values = [(name, dict(labels), value.snapshot() if isinstance(value, Histogram) else value)
+                      for (name, labels), value in self.values.items()]
+        snapshot = {}
+        for name, labels, value in values:
+            kind, help = families[name]
+            snapshot.setdefault(name, {"type": kind, "help": help, "samples": []})["samples"].append([labels, value])
+        return snapshot
+
+
+class TimedSink:
+    """A sink whose writes are timed, and counted when they fail, under its name"""
+
+    def __init__(self, sink, name, metrics):
+        self.sink = sink
+        self.name = name
+        self.metrics = metrics
+
+    def write(self, update):
+        try:
+            with self.metrics.time('pipeline_sink_seconds', sink=self.name):
+                self.sink.write(update)
+        except Exception:
+            self.metrics.inc('pipeline_sink_errors_total', sink=self.name)
+            raise
+
+
+def timed_sinks(sinks, metrics):
+    return {name: TimedSink(sink, name, metrics) for name, sink in sinks.items()}
+
+
+def writer_stats(writer, name, metrics):
+    """Drops and backlog of a BackgroundWriter"""
+    stats = writer.stats()
+    metrics.set('pipeline_sink_dropped_total', stats['dropped'], sink=name)
+    metrics.set('pipeline_sink_pending', stats['pending'], sink=name)
+
+
+class MetricsPusher:
+    """
+    POSTs a snapshot of 'metrics' to the web app every 'interval' seconds, from a daemon thread
+
+    e.g.:
+        MetricsPusher(metrics, 'http://localhost:5000/metrics', session='transactions').start()
+    """
+
+    def __init__(self, metrics, url, session, interval=5.0, timeout=5.0):
+        self.metrics = metrics
+        self.url = url
+        self.session = session
+        self.interval = interval
+        self.timeout = timeout
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='metrics', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def push(self):
+        body = json.dumps({"session": self.session, "metrics": self.metrics.snapshot()}).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.push()
+            except Exception as e:
+                print("metrics: push to {} failed: {}".format(self.url, e))
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join(self.timeout)
@@ -0,0 +1,52 @@
+import io
+
+import pandas as pd
+
+from pipeline.schema import columns, dtypes, spark_schema
+
+separators = len(columns) - 1
+
+
+def parse_lines(lines):
+    """
+    Parse a whole micro-batch of CSV lines into typed columns in a single pass
+
+    Returns a pandas DataFrame (one NumPy/categorical array per column), no Python object is built per row
+    for the numeric columns. Lines without exactly 16 fields are skipped.
+    """
+    lines = [line for line in lines if line.count(',') == separators]
+    if not lines:
+        return pd.DataFrame({column: pd.Series(dtype=dtypes[column]) for column in columns})
+    # 'round_trip' gives the float64 nearest to the text, like float(), the default parser can be an ulp off
+    return pd.read_csv(io.StringIO('\n'.join(lines)), header=None, names=columns, dtype=dtypes,
+                       engine='c', float_precision='round_trip')
+
+
+def parse_partition(lines):
+    """mapPartitions friendly version of 'parse_lines': one DataFrame per partition"""
+    yield parse_lines(list(lines))
+
+
+def parse_rdd_to_dataframe(spark, rdd):
+    """
+    Parse an RDD of CSV lines through Spark's DataFrame path
+
+    The CSV parsing and type casting happen in the JVM against the precomputed schema, so the Python
+    workers never see the individual rows.
+    """
+    return spark.read.csv(rdd, schema=spark_schema(), mode='DROPMALFORMED')
+
+
+def parse_value_column(df, column='value'):
+    """
+    DataFrame-native parsing of a streaming column of CSV lines (e.g. the socket source's 'value')
+
+    'split' plus one cast per field of the precomputed schema: the whole parsing is a Catalyst expression
+    (whole-stage codegen, no Python). Lines without exactly 16 fields are dropped.
+    """
+    from pyspark.sql import functions as F
+
+    fields = F.split(F.col(column), ',')
+    return df.where(F.size(fields) == len(columns)) \
+        .select(*[fields.getItem(i).cast(field.dataType).alias(field.name)
+                  for i, field in enumerate(spark_schema().fields)])
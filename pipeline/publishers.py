@@ -0,0 +1,123 @@
+import queue
+import threading
+
+import pandas as pd
+
+map_columns = ['id', 'entity_id', 'gps_latitude', 'gps_longitude', 'amount', 'type', 'location', 'probability']
+alert_columns = map_columns
+
+
+def concat_updates(updates):
+    """Coalesce array-valued trace updates into one, concatenating their arrays (also inside 'marker')"""
+    merged = dict(updates[0])
+    for key, value in merged.items():
+        if isinstance(value, list):
+            merged[key] = [item for update in updates for item in update[key]]
+        elif isinstance(value, dict):
+            merged[key] = concat_updates([update[key] for update in updates])
+    return merged
+
+
+def latest_update(updates):
+    """Coalesce updates that replace each other (e.g. a pie): only the most recent one matters"""
+    return updates[-1]
+
+
+class BackgroundWriter:
+    """
+    Send stream updates from a background thread through a bounded queue
+
+    'write' never blocks the streaming batch: when the queue is full the oldest pending update is dropped,
+    and the sender thread coalesces whatever is pending into a single stream write.
+    """
+
+    def __init__(self, write, coalesce=concat_updates, size=lambda update: 1, maxsize=16, name='writer'):
+        self._write = write
+        self.coalesce = coalesce
+        self.size = size
+        self.name = name
+        self.queue = queue.Queue(maxsize)
+        self.lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def write(self, update):
+        while True:
+            try:
+                self.queue.put_nowait(update)
+                return
+            except queue.Full:
+                try:
+                    dropped = self.queue.get_nowait()
+                    with self.lock:
+                        self.dropped += self.size(dropped)
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            updates = [self.queue.get()]
+            while len(updates) < self.queue.maxsize:
+                try:
+                    updates.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if updates[-1] is None:
+                updates.pop()
+                if updates:
+                    self._send(updates)
+                return
+            self._send(updates)
+
+    def _send(self, updates):
+        update = self.coalesce(updates) if len(updates) > 1 else updates[0]
+        try:
+            self._write(update)
+        except Exception as e:
+            print("{}: stream write failed: {}".format(self.name, e))
+            return
+        with self.lock:
+            self.written += self.size(update)
+            self.coalesced += len(updates) - 1
+
+    def stats(self):
+        with self.lock:
+            return {"written": self.written, "dropped": self.dropped, "coalesced": self.coalesced,
+                    "pending": self.queue.qsize()}
+
+    def close(self, timeout=10):
+        """Flush the pending updates and stop the sender thread"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+def map_update(transactions, colors, size=15):
+    """
+    A single array-valued Scattermapbox update for a whole batch of transactions (pandas DataFrame)
+
+    'colors' maps every entity_id of the batch to its marker color.
+    """
+    text = (transactions["id"] + "/" + transactions["entity_id"] +
+            "\n\tAmount: " + transactions["amount"].astype(str) +
+            "\n\tType: " + transactions["type"].astype(str) +
+            "\n\tFraud: " + (transactions["probability"] * 100).round(2).astype(str) + "%")
+    return dict(lat=transactions["gps_latitude"].tolist(),
+                lon=transactions["gps_longitude"].tolist(),
+                type="Scattermapbox",
+                marker=dict(size=size, color=transactions["entity_id"].map(colors).tolist()),
+                text=text.tolist())
+
+
+def alerts_update(transactions, threshold):
+    """Transactions of the batch predicted as fraud, as a list of records"""
+    alerts = transactions.loc[transactions["probability"] > threshold, alert_columns]
+    return alerts.to_dict(orient='records')
+
+
+def entity_colors(transactions, convert):
+    """Color of every distinct entity of the batch, 'convert' colors them all in one call (e.g. convert_to_colors)"""
+    entities = pd.unique(transactions["entity_id"])
+    return dict(zip(entities, convert(entities)))
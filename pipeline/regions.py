@@ -0,0 +1,165 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# 'polygon' is a sequence of (latitude, longitude) vertices, the first one not repeated at the end
+Region = namedtuple('Region', 'name polygon')
+
+metres_per_degree = 111320.0
+
+
+def street_region(p1, p2, name, width=10.0):
+    """The segment p1-p2 widened by 'width' metres on each side, as a rectangle"""
+    lat0 = math.radians((p1[0] + p2[0]) / 2)
+    # offsets computed in a local frame where a degree of longitude is cos(lat) shorter
+    dx, dy = (p2[1] - p1[1]) * math.cos(lat0), p2[0] - p1[0]
+    length = math.hypot(dx, dy)
+    offset = width / metres_per_degree
+    nx, ny = -dy / length * offset, dx / length * offset
+    dlat, dlon = ny, nx / math.cos(lat0)
+    return Region(name, [(p1[0] + dlat, p1[1] + dlon), (p2[0] + dlat, p2[1] + dlon),
+                         (p2[0] - dlat, p2[1] - dlon), (p1[0] - dlat, p1[1] - dlon)])
+
+
+def square_region(center, radius, name):
+    """Everything within 'radius' degrees of 'center' in latitude and longitude"""
+    lat, lon = center
+    return Region(name, [(lat - radius, lon - radius), (lat - radius, lon + radius),
+                         (lat + radius, lon + radius), (lat + radius, lon - radius)])
+
+
+def notebook_regions(width=10.0):
+    """The streets and squares the dataset is generated from, in the notebook's order (which is also priority)"""
+    from dataset.generator import street_points_def, square_points_def
+
+    return [street_region(p1, p2, name, width) for p1, p2, name in street_points_def] + \
+        [square_region(center, radius, name) for center, radius, name in square_points_def]
+
+
+def _inside(polygon, lat, lon):
+    """Ray casting point-in-polygon test of arrays of points against one polygon, looping over its edges"""
+    inside = np.zeros(len(lat), dtype=bool)
+    for (lat_i, lon_i), (lat_j, lon_j) in zip(polygon, polygon[-1:] + polygon[:-1]):
+        crosses = (lat_i > lat) != (lat_j > lat)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            at = (lon_j - lon_i) * (lat - lat_i) / (lat_j - lat_i) + lon_i
+        inside ^= crosses & (lon < at)
+    return inside
+
+
+def _convex(polygon):
+    signs = set()
+    n = len(polygon)
+    for i in range(n):
+        (a0, a1), (b0, b1), (c0, c1) = polygon[i], polygon[(i + 1) % n], polygon[(i + 2) % n]
+        cross = (b0 - a0) * (c1 - b1) - (b1 - a1) * (c0 - b0)
+        if cross:
+            signs.add(cross > 0)
+    return len(signs) <= 1
+
+
+class LocationResolver:
+    """
+    Name of the region every (latitude, longitude) falls in, vectorized over whole batches
+
+    A uniform grid covers the regions' bounding box; every cell keeps the regions whose bounding box overlaps
+    it, in priority order (the order of 'regions': the first region containing a point wins). Cells lying
+    entirely inside the first of their candidates (a convex region) resolve without any polygon test, the
+    others test their points against each candidate in turn, all the points of a region at once.
+    e.g.:
+        resolver = LocationResolver(notebook_regions())
+        resolver.names(df['gps_latitude'].values, df['gps_longitude'].values)  # pandas Categorical
+    """
+
+    def __init__(self, regions, cell_size=0.0005):
+        self.regions = list(regions)
+        self.polygons = [list(map(tuple, region.polygon)) for region in self.regions]
+        # several polygons may share a name (e.g. a zone made of two areas)
+        self.categories = list(dict.fromkeys(region.name for region in self.regions))
+        self.codes = np.array([self.categories.index(region.name) for region in self.regions] + [-1],
+                              dtype=np.int32)
+        self.cell_size = cell_size
+        vertices = np.array([vertex for polygon in self.polygons for vertex in polygon])
+        self.origin = vertices.min(axis=0)
+        self.shape = tuple(int(n) + 1 for n in np.floor((vertices.max(axis=0) - self.origin) / cell_size))
+
+        candidates = [[] for _ in range(self.shape[0] * self.shape[1])]
+        for index, polygon in enumerate(self.polygons):
+            (lat0, lon0), (lat1, lon1) = self._cell(*np.min(polygon, axis=0)), self._cell(*np.max(polygon, axis=0))
+            for i in range(lat0, lat1 + 1):
+                for j in range(lon0, lon1 + 1):
+                    candidates[i * self.shape[1] + j].append(index)
+
+        # cell -> its candidates, padded with -1 to the longest list
+        depth = max(1, max(map(len, candidates)))
+        self.candidates = np.full((len(candidates), depth), -1, dtype=np.int32)
+        for cell, indexes in enumerate(candidates):
+            self.candidates[cell, :len(indexes)] = indexes
+
+        # cell -> region when the cell is entirely inside its first candidate, -1 when points must be tested
+        self.full = np.full(len(candidates), -1, dtype=np.int32)
+        first = self.candidates[:, 0]
+        i, j = np.divmod(np.arange(len(candidates)), self.shape[1])
+        corners = [(self.origin[0] + (i + di) * cell_size, self.origin[1] + (j + dj) * cell_size)
+                   for di in (0, 1) for dj in (0, 1)]
+        for index, polygon in enumerate(self.polygons):
+            cells = np.flatnonzero(first == index)
+            if not _convex(polygon) or not len(cells):
+                continue
+            inside = np.ones(len(cells), dtype=bool)
+            for lat, lon in corners:
+                inside &= _inside(polygon, lat[cells], lon[cells])
+            self.full[cells[inside]] = index
+
+    def _cell(self, lat, lon):
+        return (int(math.floor((lat - self.origin[0]) / self.cell_size)),
+                int(math.floor((lon - self.origin[1]) / self.cell_size)))
+
+    def resolve(self, lat, lon):
+        """Region index of every point, -1 outside all of them"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        i = np.floor((lat - self.origin[0]) / self.cell_size)
+        j = np.floor((lon - self.origin[1]) / self.cell_size)
+        in_grid = (i >= 0) & (i < self.shape[0]) & (j >= 0) & (j < self.shape[1])
+        cell = np.where(in_grid, i * self.shape[1] + j, 0).astype(np.int64)
+
+        resolved = np.where(in_grid, self.full[cell], -1)
+        pending = np.flatnonzero(in_grid & (resolved < 0))
+        for depth in range(self.candidates.shape[1]):
+            if not len(pending):
+                break
+            candidate = self.candidates[cell[pending], depth]
+            for index in np.unique(candidate[candidate >= 0]):
+                rows = pending[candidate == index]
+                resolved[rows[_inside(self.polygons[index], lat[rows], lon[rows])]] = index
+            pending = pending[resolved[pending] < 0]
+        return resolved
+
+    def names(self, lat, lon):
+        """Region name of every point as a pandas Categorical, NaN outside all of them"""
+        # index -1 picks the trailing -1 code
+        return pd.Categorical.from_codes(self.codes[self.resolve(lat, lon)], categories=self.categories)
+
+
+def location_column(spark, resolver, unknown='Unknown'):
+    """
+    'location' column computed from the coordinates by 'resolver' in a pandas UDF, whole Arrow batches at a time
+
+    Points outside every region get the 'unknown' location, so the aggregations never see a null key.
+
+    The resolver is broadcast once; the column can then be used on every batch, e.g.:
+        location = location_column(spark, LocationResolver(notebook_regions()))
+        transactions = transactions.withColumn('location', location)
+    """
+    from pyspark.sql import functions as F
+
+    broadcast = spark.sparkContext.broadcast(resolver)
+
+    @F.pandas_udf('string')
+    def location(lat: pd.Series, lon: pd.Series) -> pd.Series:
+        return pd.Series(broadcast.value.names(lat.values, lon.values)).astype(object).fillna(unknown)
+
+    return location('gps_latitude', 'gps_longitude')
@@ -0,0 +1,31 @@
+from functools import lru_cache
+
+columns = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig', 'nameDest', 'oldbalanceDest',
+           'newbalanceDest', 'isFraud', 'isFlaggedFraud', 'gps_latitude', 'gps_longitude', "location", "id",
+           "entity_id"]
+float_columns = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
+                 'gps_latitude', 'gps_longitude']
+category_columns = ['type', 'location']
+# low cardinality string columns, dictionary encoded on the wire (see 'pipeline.framing')
+encoded_columns = ['type', 'location', 'entity_id', 'isFraud', 'isFlaggedFraud']
+
+# Column -> position, built once instead of calling 'columns.index' per field
+column_index = {column: i for i, column in enumerate(columns)}
+
+# pandas dtypes for 'read_csv', every non float column is kept as a string like 'parse_row' did
+dtypes = {column: 'float64' if column in float_columns else
+          'category' if column in category_columns else 'str'
+          for column in columns}
+
+
+@lru_cache(maxsize=None)
+def spark_schema():
+    """
+    Explicit StructType for the 16 transaction columns
+
+    Built lazily so the module can be imported where pyspark is not available (e.g. the replay source)
+    """
+    from pyspark.sql.types import StructType, StructField, DoubleType, StringType
+
+    return StructType([StructField(column, DoubleType() if column in float_columns else StringType(), True)
+                       for column in columns])
@@ -0,0 +1,63 @@
+import os
+import time
+from collections import deque, namedtuple
+
+# the same 8 features, in the same order, as the notebook's VectorAssembler
+feature_columns = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
+                   'gps_latitude', 'gps_longitude']
+
+model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', 'models',
+                          'pythonLogisticRegression')
+# the same model trained by 'dataset.train' over the per-entity features too ('entity_model_columns')
+entity_model_path = os.path.join(os.path.dirname(model_path), 'pythonLogisticRegressionEntities')
+
+BatchStats = namedtuple('BatchStats', 'rows seconds')
+
+
+class SparkScorer:
+    """
+    Fraud scoring stage backed by the persisted 'LogisticRegressionModel'
+
+    The model is loaded once on the driver and its coefficients are compiled into a single Catalyst
+    expression (sigmoid of the linear margin), so every executor scores a whole partition in generated
+    code: no VectorAssembler, no Python UDF and no per-row round trip.
+    """
+
+    def __init__(self, path=model_path, columns=feature_columns):
+        """'columns' are the model's inputs in training order, e.g. with 'entity_feature_columns' once retrained"""
+        from pyspark.ml.classification import LogisticRegressionModel
+
+        model = LogisticRegressionModel.load(path)
+        if model.numFeatures != len(columns):
+            raise ValueError("The model at {} has {} features, not {}: {}".format(path, model.numFeatures,
+                                                                                len(columns), columns))
+        self.columns = list(columns)
+        self.coefficients = model.coefficients.toArray().tolist()
+        self.intercept = model.intercept
+        self.threshold = model.getThreshold()
+        self.stats = deque(maxlen=100)
+
+    def margin(self):
+        from pyspark.sql import functions as F
+
+        margin = F.lit(self.intercept)
+        for column, coefficient in zip(self.columns, self.coefficients):
+            margin = margin + F.col(column) * F.lit(coefficient)
+        return margin
+
+    def transform(self, df):
+        """Append 'probability' (of fraud) and 'prediction' columns to a parsed transactions DataFrame"""
+        from pyspark.sql import functions as F
+
+        probability = F.lit(1.0) / (F.lit(1.0) + F.exp(-self.margin()))
+        return df.withColumn('probability', probability) \
+            .withColumn('prediction', (F.col('probability') > F.lit(self.threshold)).cast('double'))
+
+    def score(self, df):
+        """Score and materialize a micro-batch, recording its latency and throughput"""
+        start = time.perf_counter()
+        scored = self.transform(df).cache()
+        n = scored.count()
+        elapsed = time.perf_counter() - start
+        self.stats.append(BatchStats(n, elapsed))
+        return scored
@@ -0,0 +1,54 @@
+from functools import reduce
+
+
+def parse_endpoints(endpoints, default_host='localhost'):
+    """
+    'host:port,host:port,...' -> [(host, port), ...], a bare port uses 'default_host'
+    e.g.:
+    parse_endpoints('localhost:5900,5901') => [('localhost', 5900), ('localhost', 5901)]
+    """
+    parsed = []
+    for endpoint in endpoints.split(','):
+        host, _, port = endpoint.strip().rpartition(':')
+        parsed.append((host or default_host, int(port)))
+    return parsed
+
+
+def check_parallelism(sc, receivers):
+    """Every socket receiver pins one core for good: warn when none would be left for the processing"""
+    if sc.defaultParallelism <= receivers:
+        print("Warning: {} receivers on {} cores, no core left to process the batches "
+              "(use a larger local[N])".format(receivers, sc.defaultParallelism))
+
+
+def union_socket_streams(ssc, endpoints, partitions=None):
+    """
+    One DStream receiver per endpoint, unioned and repartitioned across 'partitions' (default: all cores)
+    so the batch processing is not bound to the receivers' blocks
+    """
+    sc = ssc.sparkContext
+    check_parallelism(sc, len(endpoints))
+    stream = ssc.union(*[ssc.socketTextStream(host, port) for host, port in endpoints])
+    return stream.repartition(partitions or sc.defaultParallelism)
+
+
+def read_socket_streams(spark, endpoints, partitions=None):
+    """Structured Streaming counterpart of 'union_socket_streams' (a 'value' column of CSV lines)"""
+    sc = spark.sparkContext
+    check_parallelism(sc, len(endpoints))
+    streams = [spark.readStream.format("socket").option("host", host).option("port", port).load()
+               for host, port in endpoints]
+    return reduce(lambda a, b: a.union(b), streams).repartition(partitions or sc.defaultParallelism)
+
+
+def read_framed_streams(spark, endpoints, partitions=None):
+    """
+    'read_socket_streams' for sources offering the Arrow framing, through the 'replay' Python data source
+    (Spark 4.0+): the rows arrive typed, there is no CSV to parse
+    """
+    from pipeline.framing import replay_data_source
+
+    spark.dataSource.register(replay_data_source())
+    streams = [spark.readStream.format('replay').option('host', host).option('port', port).load()
+               for host, port in endpoints]
+    return reduce(lambda a, b: a.union(b), streams).repartition(partitions or spark.sparkContext.defaultParallelism)
@@ -0,0 +1,127 @@
+import json
+import math
+import os
+from collections import deque
+
+dimensions = ['location', 'type']
+# key of the rows whose dimension is null (e.g. a location outside every region)
+unknown = 'Unknown'
+
+
+def _add(totals, partial, sign=1):
+    for key, (amount, count) in partial.items():
+        total_amount, total_count = totals.get(key, (0.0, 0))
+        total_count += sign * count
+        if total_count:
+            totals[key] = (total_amount + sign * amount, total_count)
+        else:
+            # exact zero instead of the float residue of add/subtract, and no empty keys left behind
+            totals.pop(key, None)
+
+
+class WindowedTotals:
+    """
+    Sliding-window totals (amount, count) by key, maintained incrementally from per-batch partials
+
+    The partials of the last batches are kept in a ring buffer; on every batch the new partial is added
+    to the running total of each window and the partial that just left the window is subtracted
+    (inverse reduce), so a 15 minutes window costs the same as a 1 minute one.
+    e.g.:
+        totals = WindowedTotals(batch_interval=5, windows=(60, 300))
+        totals.add({'Oxford Street': (120.5, 2)})
+        totals.totals[60] => {'Oxford Street': (120.5, 2)}
+    """
+
+    def __init__(self, batch_interval, windows=(60, 300, 900)):
+        self.batch_interval = batch_interval
+        self.lengths = {window: max(1, int(math.ceil(window / float(batch_interval)))) for window in windows}
+        self.partials = deque(maxlen=max(self.lengths.values()) + 1)
+        self.totals = {window: {} for window in windows}
+
+    def add(self, partial):
+        self.partials.append(partial)
+        for window, length in self.lengths.items():
+            _add(self.totals[window], partial)
+            if len(self.partials) > length:
+                _add(self.totals[window], self.partials[-length - 1], sign=-1)
+
+    def window(self, window):
+        """
+        Totals of a window as three columns: (keys, amounts, counts), sorted by key
+
+        Window 0 is the last batch alone (the 'last period').
+        """
+        if window:
+            totals = self.totals[window]
+        else:
+            totals = self.partials[-1] if self.partials else {}
+        # null keys (older checkpoints) sort last instead of failing to compare with strings
+        keys = sorted(totals, key=lambda key: (key is None, key or ''))
+        return keys, [totals[key][0] for key in keys], [totals[key][1] for key in keys]
+
+    def state(self):
+        return {'batch_interval': self.batch_interval, 'windows': list(self.lengths),
+                'partials': [{key: list(value) for key, value in partial.items()} for partial in self.partials]}
+
+    @staticmethod
+    def from_state(state):
+        totals = WindowedTotals(state['batch_interval'], state['windows'])
+        for partial in state['partials']:
+            totals.add({key: tuple(value) for key, value in partial.items()})
+        return totals
+
+
+class WindowedAggregates:
+    """'WindowedTotals' for every aggregation dimension ('location' and 'type'), with an optional checkpoint"""
+
+    def __init__(self, batch_interval, windows=(60, 300, 900), checkpoint=None):
+        self.checkpoint = checkpoint
+        self.by = {dimension: WindowedTotals(batch_interval, windows) for dimension in dimensions}
+        if checkpoint and os.path.isfile(checkpoint):
+            with open(checkpoint) as f:
+                state = json.load(f)
+            if state.get('windows') == list(windows) and state.get('batch_interval') == batch_interval:
+                self.by = {dimension: WindowedTotals.from_state(state['by'][dimension]) for dimension in dimensions}
+
+    def add(self, partials):
+        """'partials' maps each dimension to the partial {key: (amount, count)} of one batch"""
+        for dimension in dimensions:
+            self.by[dimension].add(partials.get(dimension, {}))
+        if self.checkpoint:
+            self.save()
+
+    def save(self):
+        state = {'batch_interval': self.by[dimensions[0]].batch_interval,
+                 'windows': list(self.by[dimensions[0]].lengths),
+                 'by': {dimension: totals.state() for dimension, totals in self.by.items()}}
+        with open(self.checkpoint + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.checkpoint + '.tmp', self.checkpoint)
+
+    def update(self):
+        """All the windowed totals as one JSON friendly document"""
+        return {dimension: {str(window): dict(zip(('labels', 'amounts', 'counts'), totals.window(window)))
+                            for window in totals.totals}
+                for dimension, totals in self.by.items()}
+
+
+def batch_partials(df):
+    """
+    Per-batch partial (amount, count) by location and by type, computed by Spark in a single job
+
+    Both aggregations are unioned so only one small result is collected to the driver. Null keys are
+    labelled 'unknown'.
+    """
+    from pyspark.sql import functions as F
+
+    aggregates = None
+    for dimension in dimensions:
+        key = F.coalesce(F.col(dimension), F.lit(unknown)).alias('key')
+        aggregate = df.groupBy(F.lit(dimension).alias('dimension'), key) \
+            .agg(F.sum('amount').alias('amount'), F.count(F.lit(1)).alias('count'))
+        aggregates = aggregate if aggregates is None else aggregates.union(aggregate)
+
+    partials = {dimension: {} for dimension in dimensions}
+    for dimension, key, amount, count in aggregates.collect():
+        partials[dimension][key] = (amount, count)
+    return partials
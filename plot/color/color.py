@@ -1,4 +1,9 @@
-import random
+import colorsys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 
 
 def get_color(n):
@@ -8,11 +13,78 @@ def get_color(n):
         return "rgb(255, 0, 0)"
 
 
+def _palette(n=64):
+    """'n' distinct colors: hues spread by the golden ratio, alternating between two lightness levels"""
+    colors = []
+    for i in range(n):
+        r, g, b = colorsys.hls_to_rgb((i * 0.618033988749895) % 1.0, 0.45 if i % 2 else 0.6, 0.75)
+        colors.append("rgb({}, {}, {})".format(int(r * 255), int(g * 255), int(b * 255)))
+    return colors
+
+
+palette = _palette()
+
+
+def palette_index(entity_ids):
+    """
+    Palette position of every entity id, vectorized
+
+    pandas' hash_array uses a fixed key, so unlike 'hash()' (salted per process by PYTHONHASHSEED) an entity
+    gets the same color on every executor and after every restart.
+    """
+    return pd.util.hash_array(np.asarray(entity_ids, dtype=object)) % np.uint64(len(palette))
+
+
+class ColorCache:
+    """
+    Bounded LRU of entity id -> color, shared by every batch of the process
+
+    Ids missing from the cache are hashed together, in a single vectorized call.
+    e.g.:
+        cache = ColorCache(maxsize=100000)
+        cache.colors(['C1231006815', 'C1666544295'])  # ['rgb(...)', 'rgb(...)']
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def colors(self, entity_ids):
+        colors = [None] * len(entity_ids)
+        missing = []
+        with self.lock:
+            for i, entity in enumerate(entity_ids):
+                color = self.entries.get(entity)
+                if color is None:
+                    missing.append(i)
+                else:
+                    self.entries.move_to_end(entity)
+                    colors[i] = color
+            if missing:
+                fresh = [entity_ids[i] for i in missing]
+                for i, entity, index in zip(missing, fresh, palette_index(fresh)):
+                    colors[i] = self.entries[entity] = palette[index]
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+            self.hits += len(entity_ids) - len(missing)
+            self.misses += len(missing)
+        return colors
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+cache = ColorCache()
+
+
 def convert_to_color(string):
-    hash_ = str(hash(string))
-    if len(hash_) >= 9:
-        r, g, b = int(hash_[-9:-6]) % 255, int(hash_[-6:-3]) % 255, int(hash_[-3:]) % 255
-        return "rgb({}, {}, {})".format(r, b, g)
-    else:
-        return "rgb({}, {}, {})".format(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+    return cache.colors([string])[0]
+
 
+def convert_to_colors(entity_ids):
+    """Colors of a sequence of entity ids (e.g. the distinct ids of a batch), in order"""
+    return cache.colors(entity_ids)
@@ -4,40 +4,35 @@ import plotly.dashboard_objs as dashboard
 import plotly.graph_objs as go
 import plotly.plotly as py
 from plotly.graph_objs import *
-from plot.transactions_map import url_maps_stream
-from plot.transactions_pie import transactions_pie_url
-
-from config import username
 
 
 def file_id_from_url(url):
     """Return fileId from a url."""
+    from config import username
+
     match = re.search(r"~{}\/(?P<id>\d+)".format(username), url)
     if match:
         return username + ":" + match.group("id")
 
 
-fieldIdPlot = file_id_from_url(transactions_pie_url)
-fieldIdMap = file_id_from_url(url_maps_stream)
-
-box_a = {
-    'type': 'box',
-    'boxType': 'plot',
-    'fileId': fieldIdPlot,
-    'title': 'Transactions Updates (Last Period)'
-}
+dashboard_name = 'Transactions Monitoring Dashboard'
 
-box_c = {
-    'type': 'box',
-    'boxType': 'plot',
-    'fileId': fieldIdMap,
-    'title': 'Transactions Map',
-}
 
-dashboard_name = 'Transactions Monitoring Dashboard'
+def upload_dashboard(transactions_pie_url, url_maps_stream):
+    box_a = {
+        'type': 'box',
+        'boxType': 'plot',
+        'fileId': file_id_from_url(transactions_pie_url),
+        'title': 'Transactions Updates (Last Period)'
+    }
 
+    box_c = {
+        'type': 'box',
+        'boxType': 'plot',
+        'fileId': file_id_from_url(url_maps_stream),
+        'title': 'Transactions Map',
+    }
 
-def upload_dashboard():
     recent_dashboards = py.dashboard_ops.get_dashboard_names()
 
     if dashboard_name not in recent_dashboards:
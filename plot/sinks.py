@@ -0,0 +1,169 @@
+import json
+import threading
+import urllib.request
+from collections import deque
+
+
+def _to_json(o):
+    """NumPy scalars and arrays that slipped into an update"""
+    if hasattr(o, 'tolist'):
+        return o.tolist()
+    return str(o)
+
+
+class Sink:
+    """
+    Destination of the pipeline's stream updates (one per plot: 'map', 'pie', ...)
+
+    Sinks are opened lazily, on their first write, so creating them costs nothing and needs no network.
+    """
+
+    def __init__(self):
+        self.opened = False
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            if not self.opened:
+                self._open()
+                self.opened = True
+        return self
+
+    def write(self, update):
+        if not self.opened:
+            self.open()
+        self._write(update)
+
+    def close(self):
+        if self.opened:
+            self._close()
+            self.opened = False
+
+    def _open(self):
+        pass
+
+    def _write(self, update):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class MemorySink(Sink):
+    """Keeps the last 'maxlen' updates in memory, for tests and benchmarks"""
+
+    def __init__(self, maxlen=None):
+        super().__init__()
+        self.updates = deque(maxlen=maxlen)
+        self.count = 0
+
+    def _write(self, update):
+        self.updates.append(update)
+        self.count += 1
+
+
+class FileSink(Sink):
+    """Appends every update as a JSON line to 'path'"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.file = None
+
+    def _open(self):
+        self.file = open(self.path, 'a', buffering=1)
+
+    def _write(self, update):
+        self.file.write(json.dumps(update, default=_to_json) + '\n')
+
+    def _close(self):
+        self.file.close()
+
+
+class PlotlySink(Sink):
+    """
+    Hosted Plotly stream
+
+    'opener' creates the plot and returns its (stream, url): it is only called on the first write.
+    """
+
+    def __init__(self, opener):
+        super().__init__()
+        self.opener = opener
+        self.stream = None
+        self.url = None
+
+    def _open(self):
+        self.stream, self.url = self.opener()
+        self.stream.open()
+
+    def _write(self, update):
+        self.stream.write(update)
+
+    def _close(self):
+        self.stream.close()
+
+
+class HttpSink(Sink):
+    """
+    POSTs every update as an '{event, data}' JSON document, e.g. to the Flask app's '/stream/events'
+    which fans it out to the browsers over Server-Sent Events
+    """
+
+    def __init__(self, url, event, timeout=5):
+        super().__init__()
+        self.url = url
+        self.event = event
+        self.timeout = timeout
+
+    def _write(self, update):
+        body = json.dumps({'event': self.event, 'data': update}, default=_to_json).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def plotly_sinks():
+    """Map and pie Plotly streams, the dashboard is uploaded when the pie stream is first opened"""
+
+    def open_maps():
+        from plot.transactions_map import open_maps_stream
+        return open_maps_stream()
+
+    maps = PlotlySink(open_maps)
+
+    def open_pie():
+        from plot.transactions_pie import open_transactions_pie_stream
+        from plot.dashboard import upload_dashboard
+
+        stream, url = open_transactions_pie_stream()
+        upload_dashboard(url, maps.open().url)
+        return stream, url
+
+    return {'map': maps, 'pie': PlotlySink(open_pie)}
+
+
+def create_sinks(backend='plotly', path=None):
+    """
+    Sinks by plot name for a backend:
+        'plotly'  hosted Plotly streams and dashboard
+        'file'    JSON lines, '<path>.map.jsonl' and '<path>.pie.jsonl'
+        'memory'  in-memory
+        'sse'     the Flask app's Server-Sent Events endpoint, 'path' is its url
+
+    Every backend but 'plotly' also has an 'alerts' sink for the transactions predicted as fraud, a
+    'windows' one for the sliding-window totals by location and type and a 'cells' one for the changed
+    cells of the grid heatmap.
+    """
+    names = ('map', 'pie', 'alerts', 'windows', 'cells')
+    if backend == 'plotly':
+        return plotly_sinks()
+    if backend == 'file':
+        return {name: FileSink("{}.{}.jsonl".format(path or 'transactions', name)) for name in names}
+    if backend == 'memory':
+        return {name: MemorySink(maxlen=1000) for name in names}
+    if backend == 'sse':
+        events = {'map': 'transactions', 'pie': 'locations', 'alerts': 'alerts', 'windows': 'windows',
+                  'cells': 'cells'}
+        return {name: HttpSink(path or 'http://localhost:5000/stream/events', events[name]) for name in names}
+    raise ValueError("Unknown sink backend: {}".format(backend))
@@ -1,94 +1,222 @@
+import argparse
+import time
+
 from pyspark.streaming import StreamingContext
 from pyspark.sql import SparkSession
-from pyspark.sql import Row
-import numpy as np
-from plotly.graph_objs import *
-
-from plot.transactions_map import maps_stream
-from plot.transactions_pie import transactions_pie_stream
-from plot.dashboard import upload_dashboard
-from plot.color.color import convert_to_color
 
-spark = SparkSession.builder.master("local[2]").appName("ScoringApp").getOrCreate()
-
-sc = spark.sparkContext
-sc.setLogLevel("ERROR")
+from plot.sinks import create_sinks
+from plot.color.color import convert_to_colors
+from pipeline.parser import parse_rdd_to_dataframe
+from pipeline.scoring import SparkScorer, entity_model_path
+from pipeline.sources import parse_endpoints, union_socket_streams
+from pipeline.windows import WindowedAggregates, batch_partials
+from pipeline.metrics import Metrics, MetricsPusher, timed_sinks, writer_stats
+from pipeline.grid import GridHeatmap, batch_cells, merge_changes, changes_size
+from pipeline.regions import LocationResolver, location_column, notebook_regions
+from pipeline.features import FeatureStore, batch_features, enrich, entity_model_columns
+from pipeline.publishers import BackgroundWriter, concat_updates, map_columns, alert_columns, map_update, \
+    entity_colors, alerts_update
 
 batchIntervalSeconds = 5
 hostname = 'localhost'
 ip = 5900
 
-columns = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig', 'nameDest', 'oldbalanceDest',
-           'newbalanceDest', 'isFraud', 'isFlaggedFraud', 'gps_latitude', 'gps_longitude', "location", "id",
-           "entity_id"]
-float_columns = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest',
-                 'gps_latitude', 'gps_longitude']
-
-transactions_pie_stream.open()
-maps_stream.open()
-upload_dashboard()
-
-
-def parse_row(row):
-    new_row = []
-    for column in columns:
-        if column in float_columns:
-            new_row.append((column, float(row[columns.index(column)])))
-        else:
-            new_row.append((column, row[columns.index(column)]))
-    return Row(**dict(new_row))
-
-
-def publish_transactions_to_map(rdd):
-    color = {}
-    for transaction in rdd.collect():
-        if transaction["entity_id"] not in color:
-            color[transaction["entity_id"]] = convert_to_color(transaction["entity_id"])
-        lat, lon = transaction["gps_latitude"], transaction["gps_longitude"]
-        maps_stream.write(
-            dict(lat=lat, lon=lon, type="Scattermapbox",
-                 marker=Marker(size=15, color=color[transaction["entity_id"]]),
-                 text="{}\n\tAmount: {}\n\tType: {}".format(transaction["id"] + "/" + transaction["entity_id"],
-                                                            transaction["amount"],
-                                                            transaction["type"])))
-
-
-def publish_transactions_to_pie(rdd):
-    if not rdd.isEmpty():
-        array_data = np.transpose(np.array(rdd.collect())).tolist()
-        transactions_pie_stream.write(dict(labels=array_data[0],
-                                           values=array_data[1],
-                                           type='pie'))
-
-
-def parse_rdd(rdd):
-    if not rdd.isEmpty():
-        return rdd.map(lambda line: line.split(",")).map(parse_row)
-    else:
-        return sc.parallelize([])
 
+def publish_transactions_to_map(df, maps_writer):
+    transactions = df.select(*map_columns).toPandas()
+    maps_writer.write(map_update(transactions, entity_colors(transactions, convert_to_colors)))
+    return transactions
 
-def create_stream(batch_interval):
-    ssc = StreamingContext(sc, batch_interval)
 
-    dstream_input = ssc.socketTextStream(hostname, ip)
+def publish_cells_to_map(df, heatmap, cells_writer):
+    """Only the grid cells this batch changed, the per-point rows stay in Spark"""
+    heatmap.add(batch_cells(df, heatmap.zooms))
+    update = heatmap.changes()
+    if update:
+        cells_writer.write(update)
 
-    dstream_parsed = dstream_input.transform(parse_rdd)
 
-    dstream_parsed.foreachRDD(publish_transactions_to_map)
+def fraud_transactions(df, threshold):
+    """The rows the alerts need, when the map does not collect the whole batch anyway"""
+    return df.filter(df['probability'] > threshold).select(*alert_columns).toPandas()
 
-    dstream_total_by_location = dstream_parsed.map(lambda row: (row["location"], row["amount"])).reduceByKey(
-        lambda a, b: a + b)
 
-    # dstream_total_by_location.pprint()
+def publish_alerts(transactions, threshold, alerts_sink):
+    alerts = alerts_update(transactions, threshold)
+    if alerts:
+        alerts_sink.write(alerts)
 
-    dstream_total_by_location.foreachRDD(publish_transactions_to_pie)
 
-    return ssc
+def publish_transactions_to_pie(labels, values, pie_sink):
+    if labels:
+        pie_sink.write(dict(labels=labels,
+                            values=values,
+                            type='pie'))
+
+
+def create_stream(spark, batch_interval, sinks, windows=(60, 300, 900), checkpoint=None, pie_window=0,
+                  endpoints=((hostname, ip),), partitions=None, metrics=None, map_mode='points', resolver=None,
+                  features=None, features_model=entity_model_path):
+    if pie_window and pie_window not in windows:
+        raise ValueError("The pie window must be 0 or one of {}: {}".format(list(windows), pie_window))
+    if map_mode == 'cells' and 'cells' not in sinks:
+        raise ValueError("The 'cells' map needs a 'cells' sink, the plotly backend only has 'map' and 'pie'")
+
+    ssc = StreamingContext(spark.sparkContext, batch_interval)
 
+    metrics = metrics or Metrics()
+    sinks = timed_sinks(sinks, metrics)
+    stage = lambda name: metrics.time('pipeline_stage_seconds', stage=name)
+
+    # with a feature store, the model trained over the per-entity features too ('dataset.train')
+    scorer = SparkScorer(features_model, entity_model_columns) if features is not None else SparkScorer()
+
+    # the zone of every transaction from its coordinates, instead of the 'location' the source sends
+    location = location_column(spark, resolver) if resolver else None
+
+    # last 1/5/15 minutes totals by location and type, updated incrementally from per-batch partials
+    aggregates = WindowedAggregates(batch_interval, windows, checkpoint)
+
+    # one array-valued update per batch, sent (and coalesced when the sink falls behind) off the batch thread:
+    # every transaction as a point, or only the changed cells of the grid heatmap
+    if map_mode == 'points':
+        maps_writer = BackgroundWriter(sinks['map'].write, coalesce=concat_updates,
+                                       size=lambda update: len(update["lat"]), name="maps_stream")
+    else:
+        heatmap = GridHeatmap()
+        maps_writer = BackgroundWriter(sinks['cells'].write, coalesce=merge_changes, size=changes_size,
+                                       name="cells_stream")
+
+    def publish_windows():
+        with stage('pie'):
+            # label and value columns straight from the aggregation, no extra job or collect
+            labels, amounts, _ = aggregates.by['location'].window(pie_window)
+            publish_transactions_to_pie(labels, amounts, sinks['pie'])
+
+        if 'windows' in sinks:
+            with stage('windows'):
+                sinks['windows'].write(aggregates.update())
+
+    def process_batch(batch_time, rdd):
+        started = time.time()
+        # counting the received blocks replaces the 'isEmpty' job and gives the parse errors below
+        lines = rdd.count()
+        if not lines:
+            # the windows count batches: an idle interval still slides them, so old totals expire on time
+            aggregates.add({})
+            publish_windows()
+            return
+        metrics.set('pipeline_scheduling_delay_seconds', started - time.mktime(batch_time.timetuple()))
+
+        with stage('total'):
+            # columnar parsing in the JVM against the precomputed schema, no Row built per line in Python; it is
+            # lazy and runs inside the first job, so the 'features' stage or else the 'score' one includes it
+            transactions = parse_rdd_to_dataframe(spark, rdd)
+            if location is not None:
+                transactions = transactions.withColumn('location', location)
+
+            # per-entity history (velocity, amount statistics, distance, balance errors) joined on every row
+            # for the model; the parsed batch is cached so the features job does not parse it again for scoring
+            parsed = None
+            if features is not None:
+                parsed = transactions = transactions.persist()
+                with stage('features'):
+                    transactions = enrich(spark, transactions, batch_features(transactions, features))
+                metrics.set('pipeline_feature_entities', len(features))
+                metrics.set('pipeline_feature_evictions_total', features.evicted)
+
+            # fraud probability computed in the JVM for the whole batch
+            with stage('score'):
+                transactions = scorer.score(transactions)
+
+            rows, seconds = scorer.stats[-1]
+            metrics.inc('pipeline_batches_total')
+            metrics.inc('pipeline_input_lines_total', lines)
+            metrics.inc('pipeline_parsed_rows_total', rows)
+            metrics.inc('pipeline_parse_errors_total', lines - rows)
+            metrics.set('pipeline_rows_per_second', rows / seconds if seconds else 0.0)
+
+            with stage('map'):
+                if map_mode == 'points':
+                    published = publish_transactions_to_map(transactions, maps_writer)
+                else:
+                    publish_cells_to_map(transactions, heatmap, maps_writer)
+            writer_stats(maps_writer, 'map', metrics)
+
+            if 'alerts' in sinks:
+                with stage('alerts'):
+                    if map_mode != 'points':
+                        published = fraud_transactions(transactions, scorer.threshold)
+                    publish_alerts(published, scorer.threshold, sinks['alerts'])
+
+            with stage('aggregation'):
+                aggregates.add(batch_partials(transactions))
+
+            publish_windows()
+
+            transactions.unpersist()
+            if parsed is not None:
+                parsed.unpersist()
+
+    # one receiver per source endpoint, unioned and spread over all the cores
+    dstream_input = union_socket_streams(ssc, endpoints, partitions)
+
+    dstream_input.foreachRDD(process_batch)
+
+    return ssc
 
-ssc = create_stream(batchIntervalSeconds)
 
-ssc.start()
-ssc.awaitTermination()
-# maps_stream.close()
+def main():
+    parser = argparse.ArgumentParser(description="Transactions scoring and monitoring streaming app")
+    parser.add_argument('--master', default="local[2]", help="e.g. local[N], N > number of sources")
+    parser.add_argument('--batch-interval', type=int, default=batchIntervalSeconds, help="seconds")
+    parser.add_argument('--sources', default="{}:{}".format(hostname, ip),
+                        help="replay endpoints, 'host:port' comma separated, one receiver each")
+    parser.add_argument('--partitions', type=int, help="partitions of every batch (default: all cores)")
+    parser.add_argument('--sink', choices=['plotly', 'file', 'memory', 'sse'], default='plotly')
+    parser.add_argument('--sink-path', help="path prefix of the 'file' sink, url of the 'sse' one")
+    parser.add_argument('--windows', default='60,300,900', help="sliding windows (seconds, comma separated)")
+    parser.add_argument('--checkpoint', help="file where the windowed aggregates are checkpointed")
+    parser.add_argument('--pie-window', type=int, default=0,
+                        help="window (one of '--windows') shown by the pie, 0 for the last batch only")
+    parser.add_argument('--map', choices=['points', 'cells'],
+                        help="one marker per transaction on the 'map' sink, or the changed cells of a grid "
+                             "heatmap on the 'cells' sink (default: points for plotly, cells otherwise)")
+    parser.add_argument('--resolve-locations', action='store_true',
+                        help="derive 'location' from the GPS coordinates (streets and squares of the notebook)")
+    parser.add_argument('--features', action='store_true',
+                        help="score with per-entity features too (velocity, amount statistics, ...)")
+    parser.add_argument('--features-model', default=entity_model_path,
+                        help="model trained over them, see 'python -m dataset.train'")
+    parser.add_argument('--features-ttl', type=float, default=24 * 3600,
+                        help="seconds after which an idle entity is forgotten")
+    parser.add_argument('--features-checkpoint', help="file where the feature store is checkpointed (.npz)")
+    parser.add_argument('--metrics-url', help="web app endpoint the stage metrics are pushed to, e.g. "
+                                              "http://localhost:5000/metrics")
+    parser.add_argument('--session', default='transactions', help="name the metrics are pushed under")
+    args = parser.parse_args()
+
+    spark = SparkSession.builder.master(args.master).appName("ScoringApp").getOrCreate()
+
+    sc = spark.sparkContext
+    sc.setLogLevel("ERROR")
+
+    metrics = Metrics()
+    if args.metrics_url:
+        MetricsPusher(metrics, args.metrics_url, args.session).start()
+
+    ssc = create_stream(spark, args.batch_interval, create_sinks(args.sink, args.sink_path),
+                        windows=[int(window) for window in args.windows.split(',')], checkpoint=args.checkpoint,
+                        pie_window=args.pie_window, endpoints=parse_endpoints(args.sources),
+                        partitions=args.partitions, metrics=metrics,
+                        map_mode=args.map or ('points' if args.sink == 'plotly' else 'cells'),
+                        resolver=LocationResolver(notebook_regions()) if args.resolve_locations else None,
+                        features=FeatureStore(ttl=args.features_ttl, checkpoint=args.features_checkpoint)
+                        if args.features else None, features_model=args.features_model)
+
+    ssc.start()
+    ssc.awaitTermination()
+
+
+if __name__ == '__main__':
+    main()
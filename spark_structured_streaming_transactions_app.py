@@ -0,0 +1,164 @@
+import argparse
+
+from pyspark.sql import SparkSession
+from pyspark.sql import functions as F
+
+from plot.sinks import create_sinks
+from pipeline.parser import parse_value_column
+from pipeline.framing import ARROW, CSV
+from pipeline.scoring import SparkScorer, entity_model_path
+from pipeline.sources import parse_endpoints, read_socket_streams, read_framed_streams
+from pipeline.publishers import BackgroundWriter, concat_updates
+from pipeline.metrics import Metrics, MetricsPusher, timed_sinks, writer_stats
+from pipeline.regions import LocationResolver, location_column, notebook_regions
+from pipeline.features import FeatureStore, batch_features, enrich, entity_model_columns
+from spark_streaming_transactions_app import publish_transactions_to_map, publish_transactions_to_pie, \
+    publish_alerts, batchIntervalSeconds, hostname, ip
+
+
+def read_transactions(spark, endpoints, partitions=None, resolver=None, framing=CSV):
+    """
+    Socket sources unioned, parsed and stamped with their arrival time, all in the streaming plan
+
+    With a 'resolver' the location comes from the coordinates instead of the source. With the 'arrow'
+    framing the sources must be started with '--binary'. Both queries of 'create_queries' open their own
+    connection to every source, so the sources must wait for 2 subscribers ('--subscribers 2').
+    """
+    if framing == ARROW:
+        transactions = read_framed_streams(spark, endpoints, partitions)
+    else:
+        transactions = parse_value_column(read_socket_streams(spark, endpoints, partitions))
+    if resolver:
+        transactions = transactions.withColumn('location', location_column(spark, resolver))
+    return transactions.withColumn("received", F.current_timestamp())
+
+
+def total_by_location(transactions, window, slide, watermark):
+    """Sliding-window amount and count by location, on arrival time, with a watermark bounding the state"""
+    return transactions.withWatermark("received", watermark) \
+        .groupBy(F.window("received", window, slide), "location") \
+        .agg(F.sum("amount").alias("amount"), F.count(F.lit(1)).alias("count"))
+
+
+def latest_window(rows, totals):
+    """
+    Label and value columns of the trailing window, from the 'update' mode rows (end, location, amount) of a
+    micro-batch merged into 'totals' ({window end: {location: amount}}, kept across batches)
+
+    In update mode a batch only holds the groups it changed, a location without arrivals in this trigger comes
+    from an earlier batch. The slide is the trigger, so every arrival of the batch updates all the windows
+    ending after its processing time: the trailing window, the last 'window' of arrivals, is the one with the
+    smallest end among the rows. Windows ending before it are closed and forgotten.
+    """
+    if not rows:
+        return [], []
+    for row in rows:
+        totals.setdefault(row["end"], {})[row["location"]] = row["amount"]
+    trailing = min(row["end"] for row in rows)
+    for end in [end for end in totals if end < trailing]:
+        del totals[end]
+    locations = sorted(totals[trailing], key=lambda location: (location is None, location or ''))
+    return locations, [totals[trailing][location] for location in locations]
+
+
+def create_queries(spark, batch_interval, sinks, window="1 minute", watermark="1 minute",
+                   endpoints=((hostname, ip),), partitions=None, checkpoint=None, metrics=None, resolver=None,
+                   framing=CSV, features=None, features_model=entity_model_path):
+    scorer = SparkScorer(features_model, entity_model_columns) if features is not None else SparkScorer()
+    metrics = metrics or Metrics()
+    sinks = timed_sinks(sinks, metrics)
+    stage = lambda name: metrics.time('pipeline_stage_seconds', stage=name)
+    trigger = "{} seconds".format(batch_interval)
+
+    maps_writer = BackgroundWriter(sinks['map'].write, coalesce=concat_updates,
+                                   size=lambda update: len(update["lat"]), name="maps_stream")
+
+    transactions = read_transactions(spark, endpoints, partitions, resolver, framing)
+
+    def publish_transactions(df, epoch_id):
+        # parsing and scoring run inside the micro-batch job, the 'map' stage includes them; the feature store
+        # lives on the driver, so with it the batch is cached, its features joined and only then scored
+        parsed = None
+        if features is not None:
+            parsed = df.persist()
+            with stage('features'):
+                df = scorer.transform(enrich(spark, parsed, batch_features(parsed, features)))
+            metrics.set('pipeline_feature_entities', len(features))
+            metrics.set('pipeline_feature_evictions_total', features.evicted)
+        with stage('map'):
+            published = publish_transactions_to_map(df, maps_writer)
+        writer_stats(maps_writer, 'map', metrics)
+        metrics.inc('pipeline_batches_total')
+        metrics.inc('pipeline_parsed_rows_total', len(published))
+        if 'alerts' in sinks:
+            with stage('alerts'):
+                publish_alerts(published, scorer.threshold, sinks['alerts'])
+        if parsed is not None:
+            parsed.unpersist()
+
+    totals = {}
+
+    def publish_locations(df, epoch_id):
+        with stage('pie'):
+            labels, values = latest_window(df.select(F.col("window.end").alias("end"), "location", "amount")
+                                           .collect(), totals)
+            publish_transactions_to_pie(labels, values, sinks['pie'])
+
+    def options(writer, name):
+        writer = writer.queryName(name).trigger(processingTime=trigger)
+        return writer.option("checkpointLocation", "{}/{}".format(checkpoint, name)) if checkpoint else writer
+
+    scored = options((transactions if features is not None else scorer.transform(transactions))
+                     .writeStream.foreachBatch(publish_transactions), "transactions").start()
+    locations = options(total_by_location(transactions, window, trigger, watermark)
+                        .writeStream.outputMode("update").foreachBatch(publish_locations), "locations").start()
+
+    return [scored, locations]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transactions scoring and monitoring app (Structured Streaming)")
+    parser.add_argument('--master', default="local[2]", help="e.g. local[N], N > number of sources")
+    parser.add_argument('--batch-interval', type=int, default=batchIntervalSeconds, help="trigger, in seconds")
+    parser.add_argument('--sources', default="{}:{}".format(hostname, ip),
+                        help="replay endpoints, 'host:port' comma separated")
+    parser.add_argument('--framing', choices=[CSV, ARROW], default=CSV,
+                        help="'arrow' negotiates binary frames with the sources (started with '--binary')")
+    parser.add_argument('--partitions', type=int, help="partitions of every micro-batch (default: all cores)")
+    parser.add_argument('--sink', choices=['plotly', 'file', 'memory', 'sse'], default='plotly')
+    parser.add_argument('--sink-path', help="path prefix of the 'file' sink, url of the 'sse' one")
+    parser.add_argument('--window', default="1 minute", help="window of the totals by location")
+    parser.add_argument('--watermark', default="1 minute")
+    parser.add_argument('--checkpoint', help="checkpoint directory of the streaming queries")
+    parser.add_argument('--resolve-locations', action='store_true',
+                        help="derive 'location' from the GPS coordinates (streets and squares of the notebook)")
+    parser.add_argument('--features', action='store_true',
+                        help="score with per-entity features too (velocity, amount statistics, ...)")
+    parser.add_argument('--features-model', default=entity_model_path,
+                        help="model trained over them, see 'python -m dataset.train'")
+    parser.add_argument('--features-ttl', type=float, default=24 * 3600,
+                        help="seconds after which an idle entity is forgotten")
+    parser.add_argument('--features-checkpoint', help="file where the feature store is checkpointed (.npz)")
+    parser.add_argument('--metrics-url', help="web app endpoint the stage metrics are pushed to")
+    parser.add_argument('--session', default='transactions', help="name the metrics are pushed under")
+    args = parser.parse_args()
+
+    spark = SparkSession.builder.master(args.master).appName("StructuredScoringApp").getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+
+    metrics = Metrics()
+    if args.metrics_url:
+        MetricsPusher(metrics, args.metrics_url, args.session).start()
+
+    create_queries(spark, args.batch_interval, create_sinks(args.sink, args.sink_path), args.window,
+                   args.watermark, endpoints=parse_endpoints(args.sources), partitions=args.partitions,
+                   checkpoint=args.checkpoint, metrics=metrics, framing=args.framing,
+                   resolver=LocationResolver(notebook_regions()) if args.resolve_locations else None,
+                   features=FeatureStore(ttl=args.features_ttl, checkpoint=args.features_checkpoint)
+                   if args.features else None, features_model=args.features_model)
+
+    spark.streams.awaitAnyTermination()
+
+
+if __name__ == '__main__':
+    main()
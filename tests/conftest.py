@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+# the replay package is imported the way the scripts next to it import it
+sys.path.insert(0, os.path.join(root, 'flask_app', 'web_app', 'scripts'))
+# the web app's blueprints, as 'web_app.*'
+sys.path.insert(0, os.path.join(root, 'flask_app'))
+
+
+locations = ["Jermyn Street", "Oxford Street", "Regent Street", "Carnaby Street", "Westfield London", "Other"]
+types = ["PAYMENT", "TRANSFER", "CASH_OUT", "DEBIT", "CASH_IN"]
+
+
+def generate_lines(n, seed=0):
+    """'n' random CSV lines of the 16 transaction columns, as the replay source sends them"""
+    rand = random.Random(seed)
+    lines = []
+    for i in range(n):
+        amount = round(rand.uniform(1, 100000), 2)
+        old_balance = round(rand.uniform(0, 200000), 2)
+        lines.append(','.join(str(v) for v in [
+            rand.randint(1, 743), rand.choice(types), amount, "C{}".format(rand.randrange(10 ** 9)),
+            old_balance, max(old_balance - amount, 0.0), "M{}".format(rand.randrange(10 ** 9)), 0.0, 0.0,
+            0, 0, rand.uniform(51.4, 51.6), rand.uniform(-0.23, -0.03), rand.choice(locations), i,
+            rand.randrange(636262)]))
+    return lines
+
+
+@pytest.fixture
+def transaction_lines():
+    return generate_lines
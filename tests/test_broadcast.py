@@ -0,0 +1,42 @@
+from flask import Flask
+
+from web_app.controllers.events import broadcaster, events
+from web_app.utils.broadcast import Broadcaster
+
+
+def test_every_subscriber_gets_every_event():
+    hub = Broadcaster()
+    clients = [hub.subscribe(), hub.subscribe()]
+    assert [next(client) for client in clients] == [b'retry: 2000\n\n'] * 2
+    assert hub.clients == 2
+    hub.publish('locations', {"labels": ["Soho"], "values": [1.5]})
+    hub.publish('alerts', [])
+    expected = b'id: 1\nevent: locations\ndata: {"labels":["Soho"],"values":[1.5]}\n\n' \
+               b'id: 2\nevent: alerts\ndata: []\n\n'
+    assert [next(client) for client in clients] == [expected] * 2
+    for client in clients:
+        client.close()
+    assert hub.clients == 0
+
+
+def test_resumes_after_the_last_event_id_and_skips_overwritten_ones():
+    hub = Broadcaster(size=2)
+    for i in range(4):
+        hub.publish('windows', i)
+    assert hub.since(2) == (4, [b'id: 3\nevent: windows\ndata: 2\n\n', b'id: 4\nevent: windows\ndata: 3\n\n'])
+    assert hub.since(0)[1] == hub.since(2)[1]
+    assert hub.since(4, timeout=0.01) == (4, [])
+
+
+def test_publish_endpoint_rejects_malformed_events():
+    app = Flask(__name__)
+    app.register_blueprint(events)
+    web = app.test_client()
+    for body in ({"event": "alerts"}, [{"event": "alerts", "data": []}, 1], "alerts"):
+        assert web.post('/stream/events', json=body).status_code == 422
+    assert web.post('/stream/events', data='not json').status_code == 422
+
+    last_id = broadcaster.last_id
+    response = web.post('/stream/events', json=[{"event": "alerts", "data": []}, {"event": "pie", "data": {}}])
+    assert response.status_code == 200
+    assert response.get_json()["id"] == broadcaster.last_id == last_id + 2
@@ -0,0 +1,39 @@
+import json
+import os
+
+from replay import JourneyCatalog
+
+
+def write(directory, i, rows):
+    path = os.path.join(directory, 'transactions_{}.csv'.format(i))
+    with open(path, 'w') as f:
+        f.write('step,amount\n' + ''.join('{},1.0\n'.format(row) for row in range(rows)))
+    return path
+
+
+def cached(directory):
+    with open(os.path.join(directory, JourneyCatalog.filename)) as f:
+        return json.load(f)['files']
+
+
+def test_rows_are_counted_on_lookup_and_persisted(tmp_path):
+    for i, rows in enumerate((3, 5, 7)):
+        write(str(tmp_path), i + 1, rows)
+    catalog = JourneyCatalog(str(tmp_path))
+    assert len(catalog) == 3 and all(journey.rows is None for journey in catalog.journeys.values())
+    assert catalog[1].rows == 5
+    assert list(cached(str(tmp_path))) == ['transactions_2.csv']
+    assert JourneyCatalog(str(tmp_path)).journeys[1].rows == 5
+
+
+def test_file_edited_in_place_is_counted_again(tmp_path):
+    path = write(str(tmp_path), 1, 3)
+    assert JourneyCatalog(str(tmp_path))[0].rows == 3
+    mtime = os.stat(path).st_mtime_ns
+    write(str(tmp_path), 1, 4)
+    # same directory entries, and even the same mtime: the size still tells
+    os.utime(path, ns=(mtime, mtime))
+    catalog = JourneyCatalog(str(tmp_path))
+    assert catalog.journeys[0].rows is None
+    assert catalog[0].rows == 4
+    assert list(catalog.lines(0))[-1] == '3,1.0'
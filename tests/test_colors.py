@@ -0,0 +1,31 @@
+import json
+import os
+import subprocess
+import sys
+
+from plot.color.color import ColorCache, palette
+
+entities = ['C1231006815', 'C1666544295', '42', 'M1979787155']
+
+
+def colors_in_a_new_process(seed):
+    code = "import json; from plot.color.color import ColorCache; print(json.dumps(ColorCache().colors({!r})))" \
+        .format(entities)
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(__file__)),
+                                     env=dict(os.environ, PYTHONHASHSEED=str(seed)))
+    return json.loads(output)
+
+
+def test_colors_do_not_depend_on_the_hash_seed():
+    colors = ColorCache().colors(entities)
+    assert all(color in palette for color in colors)
+    assert colors_in_a_new_process(1) == colors_in_a_new_process(2) == colors
+
+
+def test_evicted_entities_get_the_same_color_back():
+    cache = ColorCache(maxsize=2)
+    first = cache.colors(entities)
+    assert cache.stats() == {"size": 2, "hits": 0, "misses": 4}
+    assert cache.colors(entities[:1]) == first[:1]
+    assert cache.colors(entities[-1:]) == first[-1:]
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,10 @@
+from pipeline.framing import decode_frame, encode_frame, length
+from pipeline.schema import columns, float_columns
+
+
+def test_frame_floats_round_trip_exactly(transaction_lines):
+    lines = transaction_lines(10000)
+    batch = decode_frame(encode_frame(lines)[length.size:])
+    for column in float_columns:
+        expected = [float(line.split(',')[columns.index(column)]) for line in lines]
+        assert batch.column(column).to_pylist() == expected, column
@@ -0,0 +1,39 @@
+import numpy as np
+
+from pipeline.grid import GridHeatmap, cell_center, cell_of, merge_changes, points_cells
+
+
+def test_points_fall_in_the_cell_around_them():
+    lat, lon = np.array([51.5074, 51.5155]), np.array([-0.1278, -0.1419])
+    for zoom in (12, 16):
+        cells = cell_of(lat, lon, zoom)
+        center_lat, center_lon = cell_center(cells, zoom)
+        assert (np.abs(center_lat - lat) <= 90.0 / 2 ** zoom).all()
+        assert (np.abs(center_lon - lon) <= 180.0 / 2 ** zoom).all()
+    assert cell_of(lat, lon, 12)[0] == cell_of(lat, lon, 12)[1]
+    assert cell_of(lat, lon, 16)[0] != cell_of(lat, lon, 16)[1]
+
+
+def test_only_changed_cells_are_published_with_their_totals():
+    heatmap = GridHeatmap(zooms=(12,))
+    lat, lon = np.array([51.5074, 51.5074, 40.0]), np.array([-0.1278, -0.1278, -3.0])
+    heatmap.add(points_cells(lat, lon, np.array([10.0, 20.0, 5.0]), np.array([1.0, 0.0, 0.0]), zooms=(12,)))
+    first = heatmap.changes()['12']
+    assert sorted(zip(first['count'], first['amount'], first['fraud_rate'])) == [(1, 5.0, 0.0), (2, 30.0, 0.5)]
+    assert heatmap.changes() == {}
+
+    heatmap.add(points_cells(lat[:1], lon[:1], np.array([70.0]), np.array([0.0]), zooms=(12,)))
+    second = heatmap.changes()['12']
+    assert (second['count'], second['amount'], second['fraud_rate']) == ([3], [100.0], [1 / 3])
+    assert len(heatmap) == 2
+
+
+def test_merge_changes_keeps_the_latest_totals_of_a_cell():
+    def update(cells, counts):
+        return {'12': dict(cells=cells, lat=[0.0] * len(cells), lon=[0.0] * len(cells), count=counts,
+                           amount=[float(count) for count in counts], fraud_rate=[0.0] * len(cells))}
+
+    merged = merge_changes([update([5, 3], [1, 1]), update([3], [2])])
+    assert merged['12']['cells'] == [3, 5]
+    assert merged['12']['count'] == [2, 1]
+    assert merged['12']['amount'] == [2.0, 1.0]
@@ -0,0 +1,17 @@
+import math
+
+from pipeline.inference import NumpyLogisticRegressionModel
+from pipeline.parser import parse_lines
+from pipeline.scoring import feature_columns
+
+
+def test_numpy_model_matches_the_formula(transaction_lines):
+    model = NumpyLogisticRegressionModel.load()
+    assert len(model.coefficients) == len(feature_columns) and model.threshold == 0.01
+    transactions = parse_lines(transaction_lines(200))
+    probability, prediction = model.transform(transactions)
+    for i, row in enumerate(transactions[feature_columns].itertuples(index=False)):
+        margin = model.intercept + sum(float(x) * w for x, w in zip(row, model.coefficients))
+        expected = 1.0 / (1.0 + math.exp(-margin)) if margin > -700 else 0.0
+        assert math.isclose(probability[i], expected, rel_tol=1e-12, abs_tol=1e-300)
+        assert prediction[i] == float(expected > model.threshold)
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from pipeline.metrics import Metrics
+from web_app.utils.metrics import merge, render
+
+
+def test_snapshot_renders_as_prometheus_text():
+    metrics = Metrics()
+    metrics.inc('pipeline_batches_total')
+    metrics.inc('pipeline_batches_total')
+    metrics.set('pipeline_rows_per_second', 1500.5)
+    metrics.observe('pipeline_stage_seconds', 0.003, stage='score')
+    metrics.observe('pipeline_stage_seconds', 0.2, stage='score')
+    metrics.inc('pipeline_sink_errors_total', sink='ma"p')
+
+    # the snapshot goes through JSON, as pushed to the web app
+    text = render(merge(('demo', json.loads(json.dumps(metrics.snapshot())))))
+    lines = text.splitlines()
+    assert '# TYPE pipeline_batches_total counter' in lines
+    assert 'pipeline_batches_total{session="demo"} 2' in lines
+    assert 'pipeline_rows_per_second{session="demo"} 1500.5' in lines
+    assert 'pipeline_stage_seconds_bucket{le="0.001",session="demo",stage="score"} 0' in lines
+    assert 'pipeline_stage_seconds_bucket{le="0.005",session="demo",stage="score"} 1' in lines
+    assert 'pipeline_stage_seconds_bucket{le="0.25",session="demo",stage="score"} 2' in lines
+    assert 'pipeline_stage_seconds_bucket{le="+Inf",session="demo",stage="score"} 2' in lines
+    assert 'pipeline_stage_seconds_count{session="demo",stage="score"} 2' in lines
+    assert 'pipeline_sink_errors_total{session="demo",sink="ma\\"p"} 1' in lines
+
+
+def test_type_mismatch_is_refused():
+    with pytest.raises(ValueError):
+        Metrics().inc('pipeline_rows_per_second')
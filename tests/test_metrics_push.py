@@ -0,0 +1,36 @@
+from flask import Flask
+
+from web_app.controllers.metrics import metrics, store
+from web_app.utils.metrics import merge, render
+
+gauge = {"type": "gauge", "help": "Entities held by the feature store", "samples": [[{}, 3]]}
+
+
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(metrics)
+    return app.test_client()
+
+
+def test_malformed_families_are_rejected():
+    web = client()
+    for family in (1, dict(gauge, type='bogus'), dict(gauge, help=None), dict(gauge, samples=[[{}, 'x']]),
+                   dict(gauge, samples=[{}])):
+        response = web.post('/metrics', json={"session": "bad", "metrics": {"pipeline_feature_entities": family}})
+        assert response.status_code == 422
+    assert 'bad' not in dict(store.sources())
+
+
+def test_pushed_snapshot_is_exported():
+    web = client()
+    assert web.post('/metrics', json={"session": "good", "metrics": {"pipeline_feature_entities": gauge}}) \
+        .status_code == 200
+    response = web.get('/metrics')
+    assert response.status_code == 200
+    assert b'pipeline_feature_entities{session="good"} 3' in response.data
+
+
+def test_merge_skips_bad_families():
+    families = merge(('bad', {'foo': 1}), ('good', {'pipeline_feature_entities': gauge}))
+    assert list(families) == ['pipeline_feature_entities']
+    assert 'pipeline_feature_entities{session="good"} 3' in render(families)
@@ -0,0 +1,24 @@
+from pipeline.parser import parse_lines
+from pipeline.schema import columns, dtypes, float_columns
+
+
+def test_malformed_lines_are_dropped(transaction_lines):
+    lines = transaction_lines(5)
+    df = parse_lines([lines[0], 'garbage', lines[1] + ',extra', ','.join(lines[2].split(',')[:-1]), lines[3]])
+    assert df['id'].tolist() == ['0', '3']
+
+
+def test_columns_are_typed(transaction_lines):
+    lines = transaction_lines(3)
+    df = parse_lines(lines)
+    assert list(df.columns) == columns
+    assert {column: str(df[column].dtype) for column in float_columns} == {column: 'float64'
+                                                                            for column in float_columns}
+    assert str(df['type'].dtype) == dtypes['type'] == 'category'
+    assert df['amount'].tolist() == [float(line.split(',')[columns.index('amount')]) for line in lines]
+
+
+def test_no_valid_line_gives_an_empty_typed_frame():
+    df = parse_lines(['', 'a,b'])
+    assert len(df) == 0 and list(df.columns) == columns
+    assert str(df['amount'].dtype) == 'float64'
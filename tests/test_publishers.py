@@ -0,0 +1,60 @@
+import threading
+
+from pipeline.publishers import BackgroundWriter, concat_updates
+
+
+class BlockedSink:
+    """Records the updates, the first write waits until 'release'"""
+
+    def __init__(self):
+        self.updates = []
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def write(self, update):
+        self.started.set()
+        self.released.wait(5)
+        self.updates.append(update)
+
+    def release(self):
+        self.released.set()
+
+
+def points(*values):
+    return {"lat": list(values), "marker": {"color": ['red'] * len(values)}}
+
+
+def test_pending_updates_are_coalesced_into_one_write():
+    sink = BlockedSink()
+    writer = BackgroundWriter(sink.write, coalesce=concat_updates, size=lambda update: len(update["lat"]))
+    writer.write(points(1))
+    assert sink.started.wait(5)
+    for value in (2, 3, 4):
+        writer.write(points(value))
+    sink.release()
+    writer.close()
+    assert sink.updates == [points(1), points(2, 3, 4)]
+    assert writer.stats() == {"written": 4, "dropped": 0, "coalesced": 2, "pending": 0}
+
+
+def test_oldest_updates_are_dropped_when_the_queue_is_full():
+    sink = BlockedSink()
+    writer = BackgroundWriter(sink.write, size=lambda update: len(update["lat"]), maxsize=2)
+    writer.write(points(1))
+    assert sink.started.wait(5)
+    for value in (2, 3, 4, 5):
+        writer.write(points(value))
+    assert writer.stats()["dropped"] == 2
+    sink.release()
+    writer.close()
+    assert sink.updates == [points(1), points(4, 5)]
+
+
+def test_close_flushes_and_stops_the_thread():
+    sink = BlockedSink()
+    sink.release()
+    writer = BackgroundWriter(sink.write)
+    writer.write(points(1))
+    writer.close()
+    assert not writer.thread.is_alive()
+    assert sink.updates == [points(1)]
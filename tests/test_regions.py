@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.regions import LocationResolver, Region, _inside, notebook_regions
+
+
+def test_points_resolve_to_the_first_region_containing_them():
+    resolver = LocationResolver(notebook_regions())
+    # middle of Jermyn Street, Westfield, elsewhere in London ('Other' square), Paris
+    lat, lon = [51.50852, 51.507311, 51.45, 48.8566], [-0.1364925, -0.221633, -0.05, 2.3522]
+    names = resolver.names(lat, lon)
+    assert list(names[:3]) == ["Jermyn Street", "Westfield London", "Other"]
+    assert pd.isna(names[3])
+
+
+def test_grid_matches_a_test_of_every_polygon():
+    regions = notebook_regions()
+    resolver = LocationResolver(regions)
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(51.35, 51.65, 20000), rng.uniform(-0.25, 0.0, 20000)
+    # dense around the streets too, where the cells need polygon tests
+    lat = np.r_[lat, rng.uniform(51.506, 51.517, 20000)]
+    lon = np.r_[lon, rng.uniform(-0.16, -0.13, 20000)]
+
+    expected = np.full(len(lat), -1)
+    for index, region in reversed(list(enumerate(regions))):
+        expected[_inside(list(region.polygon), lat, lon)] = index
+    assert (resolver.resolve(lat, lon) == expected).all()
+
+
+def test_regions_sharing_a_name_share_the_category():
+    resolver = LocationResolver([Region('zone', [(0, 0), (0, 1), (1, 1), (1, 0)]),
+                                 Region('zone', [(2, 0), (2, 1), (3, 1), (3, 0)])], cell_size=0.25)
+    assert list(resolver.names([0.5, 2.5], [0.5, 0.5])) == ['zone', 'zone']
+    assert list(resolver.names([0.5, 2.5], [0.5, 0.5]).categories) == ['zone']
@@ -0,0 +1,30 @@
+import asyncio
+
+from replay import RateScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_report_when_behind():
+    clock = FakeClock()
+    scheduler = RateScheduler(1000, clock=clock)
+
+    async def replay():
+        # a source that can only send 100 events per second
+        while clock.now < 10:
+            n = min(await scheduler.acquire(), 10)
+            scheduler.record(n)
+            clock.now += n / 100
+
+    asyncio.run(replay())
+    report = scheduler.report()
+    assert abs(report['achieved_rate'] - 100) < 1
+    assert report['skipped'] > 0
+    assert report['late'] > 0.9
+    assert report['behind'] > 8
@@ -0,0 +1,19 @@
+import asyncio
+
+from replay import ReplayServer, BLOCK
+
+
+async def _replay(lines, buffer_size, port):
+    server = await ReplayServer(port=port, buffer_size=buffer_size, policy=BLOCK).start()
+    reader, writer = await asyncio.open_connection('localhost', port)
+    await server.wait_for_subscribers()
+    await asyncio.wait_for(server.publish(lines), timeout=5)
+    await server.close()
+    received = (await reader.read()).decode('utf-8').splitlines()
+    writer.close()
+    return received
+
+
+def test_block_publish_larger_than_buffer():
+    lines = ['line {}'.format(i) for i in range(25)]
+    assert asyncio.run(_replay(lines, buffer_size=10, port=5981)) == lines
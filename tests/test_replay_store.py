@@ -0,0 +1,10 @@
+from replay import JourneyStore, compile_journeys
+
+
+def test_close_with_lines_still_referenced(tmp_path):
+    path = str(tmp_path / 'journeys.bin')
+    compile_journeys({1: ['1,a', '2,b']}, path)
+    store = JourneyStore(path)
+    lines = list(store.lines(1))
+    store.close()
+    assert [bytes(line) for line in lines] == [b'1,a\n', b'2,b\n']
@@ -0,0 +1,37 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from pipeline.inference import NumpyLogisticRegressionModel
+from pipeline.parser import parse_lines
+from pipeline.schema import spark_schema
+from pipeline.scoring import feature_columns
+
+pytest.importorskip('pyspark')
+pytestmark = pytest.mark.skipif(shutil.which('java') is None, reason="Spark needs a JVM")
+
+
+@pytest.fixture(scope='module')
+def spark():
+    from pyspark.sql import SparkSession
+
+    session = SparkSession.builder.master('local[1]').appName('ScoringTest').getOrCreate()
+    yield session
+    session.stop()
+
+
+def test_catalyst_scoring_matches_numpy_and_the_formula(spark, transaction_lines):
+    from pipeline.scoring import SparkScorer
+
+    transactions = parse_lines(transaction_lines(200))
+    df = spark.createDataFrame(transactions.astype({'type': str, 'location': str}), schema=spark_schema())
+    scored = SparkScorer().transform(df).select('id', 'probability', 'prediction').toPandas().set_index('id')
+
+    model = NumpyLogisticRegressionModel.load()
+    probability, prediction = model.transform(transactions)
+    margin = transactions[feature_columns].values @ model.coefficients + model.intercept
+    np.testing.assert_allclose(scored.loc[transactions['id'], 'probability'], probability, rtol=1e-12)
+    np.testing.assert_allclose(probability, 1.0 / (1.0 + np.exp(-margin)), rtol=1e-12)
+    assert (scored.loc[transactions['id'], 'prediction'].values == prediction).all()
+
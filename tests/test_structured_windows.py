@@ -0,0 +1,14 @@
+from spark_structured_streaming_transactions_app import latest_window
+
+
+def test_trailing_window_keeps_locations_without_new_arrivals():
+    totals = {}
+    latest_window([{'end': 60, 'location': 'Oxford Street', 'amount': 10.0},
+                   {'end': 60, 'location': 'Soho Square', 'amount': 5.0}], totals)
+    # only Oxford Street had arrivals in this trigger, Soho Square still counts in the window ending at 60
+    rows = [{'end': 60, 'location': 'Oxford Street', 'amount': 12.0},
+            {'end': 65, 'location': 'Oxford Street', 'amount': 2.0}]
+    assert latest_window(rows, totals) == (['Oxford Street', 'Soho Square'], [12.0, 5.0])
+    assert latest_window([{'end': 65, 'location': 'Oxford Street', 'amount': 3.0}], totals) == \
+        (['Oxford Street'], [3.0])
+    assert 60 not in totals
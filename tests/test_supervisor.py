@@ -0,0 +1,70 @@
+import sys
+import time
+
+import pytest
+
+from web_app.utils.supervisor import Supervisor
+
+
+def python(code):
+    return lambda port: [sys.executable, '-c', code.format(port=port)]
+
+
+listening = python("import time; print('Listening on port: {port}'); time.sleep(60)")
+sleeping = python("import time; time.sleep(60)")
+
+
+def wait_for(session, state, timeout=10):
+    deadline = time.monotonic() + timeout
+    while session.status()['state'] != state and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return session.status()['state']
+
+
+@pytest.fixture
+def supervisor():
+    supervisor = Supervisor(base_port=5990)
+    yield supervisor
+    supervisor.stop_all(timeout=2)
+
+
+def test_session_runs_once_the_source_listens_then_stops(supervisor):
+    session = supervisor.start('demo', listening, sleeping)
+    assert session.state == 'starting'
+    assert wait_for(session, 'running') == 'running'
+    assert session.port == 5990 and supervisor.status('demo')['pids'].keys() == {'demo/source', 'demo/spark'}
+    with pytest.raises(KeyError):
+        supervisor.start('demo', listening, sleeping)
+    assert supervisor.start('other', listening, sleeping).port == 5991
+
+    codes = supervisor.stop('demo', timeout=2)
+    assert session.state == 'stopped'
+    assert set(codes) == {'demo/source', 'demo/spark'} and all(code is not None for code in codes.values())
+    assert supervisor.status('demo') is None and supervisor.stop('demo') is None
+
+
+def test_source_exiting_before_listening_fails_the_session(supervisor):
+    session = supervisor.start('demo', python("raise SystemExit(3)"), sleeping)
+    assert wait_for(session, 'failed') == 'failed'
+    assert session.error == "source exited with code 3 before listening"
+    assert session.spark is None
+
+
+def test_spark_exiting_fails_a_running_session(supervisor):
+    session = supervisor.start('demo', listening, python("raise SystemExit(1)"))
+    assert wait_for(session, 'failed') == 'failed'
+    assert session.error == "spark exited with code 1"
+    assert not session.source.alive()
+    # a failed session can be started again under its name
+    assert wait_for(supervisor.start('demo', listening, sleeping), 'running') == 'running'
+
+
+def test_base_port_is_configured_once_with_the_blueprint():
+    from flask import Flask
+
+    from web_app.controllers.streams import streams, supervisor
+
+    app = Flask(__name__)
+    app.config['STREAM_BASE_PORT'] = 6100
+    app.register_blueprint(streams)
+    assert supervisor.base_port == 6100
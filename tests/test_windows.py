@@ -0,0 +1,16 @@
+from pipeline.windows import WindowedTotals
+
+
+def test_idle_batches_expire_the_window():
+    totals = WindowedTotals(batch_interval=5, windows=(10,))
+    totals.add({'Oxford Street': (120.5, 2)})
+    totals.add({})
+    assert totals.window(10) == (['Oxford Street'], [120.5], [2])
+    totals.add({})
+    assert totals.window(10) == ([], [], [])
+
+
+def test_null_keys_sort_last():
+    totals = WindowedTotals(batch_interval=5, windows=(10,))
+    totals.add({None: (1.0, 1), 'Oxford Street': (2.0, 1)})
+    assert totals.window(10)[0] == ['Oxford Street', None]